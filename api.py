@@ -1,27 +1,128 @@
+import os
+import asyncio
+import functools
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, Request, HTTPException
 from fastapi import Form, UploadFile, File
 from fastapi.responses import HTMLResponse  # ✅ Import at the top
 from pydantic import BaseModel
-from graph import build_graph
-from typing import Optional
+from graph import get_graph, reconcile_offer_deliveries
+from typing import Dict, Optional
 import traceback
 import json 
 from logging_config import setup_logger
 from exceptions import FileProcessingError, ValidationException
-from validators import validate_resume_file
+from validators import (
+    MAGIC_BYTES_LENGTH,
+    MAX_FILE_SIZE_BYTES,
+    validate_resume_file,
+    validate_resume_header,
+)
+from blob_store import get_blob_path, put_blob_file, spool_dir, store_resume
+from resume_extraction import extract_text_from_resume_file
+from ingestion_queue import (
+    IngestionWorkerPool,
+    enqueue_application,
+    get_application_status,
+    mark_step,
+)
+from locks import job_lock
+from candidate_pipeline import WebhookSource, collect_candidates, confirm_sources, default_sources, normalize_email, run_pipeline
+from outbox import enqueue_emails, outbox_metrics
+from state import merge_candidates
 
 # Initialize Logger
 logger = setup_logger("API")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Background work that lives as long as the API process."""
+    # Keep checkpoints.db bounded for long-lived hiring threads
+    from checkpointer import start_compaction_job
+    start_compaction_job()
+    # Drain queued applications in the background
+    ingestion_workers.start()
+    try:
+        yield
+    finally:
+        ingestion_workers.stop()
+        _blocking_pool.shutdown(wait=False, cancel_futures=True)
+
 app = FastAPI(
+    lifespan=lifespan,
     title="HR Agent Webhook API",
     description="Webhook endpoints for the Advanced HR Agent workflow",
     version="1.0.0"
 )
 
-# Build the graph once at startup
-graph_app = build_graph()
+# Resume uploads are bounded before the multipart parser sees them. The
+# allowance covers the other form fields and multipart framing.
+UPLOAD_PATH = "/webhook/submit-application"
+MAX_UPLOAD_BODY_BYTES = MAX_FILE_SIZE_BYTES + 256 * 1024
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized application uploads with 413: up front from
+    Content-Length, or as soon as a chunked body crosses the limit.
+    """
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            try:
+                too_large = int(content_length) > self.max_bytes
+            except ValueError:
+                too_large = False
+            if too_large:
+                response = HTMLResponse(
+                    content=f"<h1>Invalid Input</h1><p>File too large. Max size is {MAX_FILE_SIZE_BYTES // (1024 * 1024)}MB.</p>",
+                    status_code=413
+                )
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-raises HTTPException from body parsing
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware, path=UPLOAD_PATH, max_bytes=MAX_UPLOAD_BODY_BYTES)
+
+# Shared compiled graph (built once per process)
+graph_app = get_graph()
+
+# LangGraph (checkpointer, LLM-backed nodes), resume parsing and Gmail are all
+# synchronous. Endpoints hand them to this bounded pool so a slow request
+# never stalls the event loop for every other request on the worker.
+BLOCKING_WORKERS = int(os.getenv("API_BLOCKING_WORKERS", "16"))
+_blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="api-blocking")
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs a blocking call on the API thread pool and awaits its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_pool, functools.partial(func, *args, **kwargs))
 
 class OfferReplyRequest(BaseModel):
     job_id: str
@@ -165,9 +266,8 @@ async def show_application_form(job_id: str):
     """
     return HTMLResponse(content=html_form, status_code=200)
 
-@app.post("/webhook/submit-application")
+@app.post(UPLOAD_PATH)
 async def submit_application(
-    request: Request,
     job_id: str = Form(...),
     name: str = Form(...),
     email: str = Form(...),
@@ -180,56 +280,30 @@ async def submit_application(
     Process application submission and add to candidate pool.
     """
     try:
-        # STEP 1: Read resume file
+        # STEP 1: Spool the resume to disk in chunks, checking size and
+        # file type as it streams in
         logger.info(f"Processing application for {name}")
-        resume_content = await resume.read()
-        validate_resume_file(resume.filename, len(resume_content))
-        resume_filename = resume.file.filename
+        resume_filename = resume.filename
+        validate_resume_file(resume_filename, resume.size or 0)
+        spooled_path = await spool_upload(resume)
         
-        # STEP 2: Save resume to storage (or extract text)
-        # For now, we'll extract text from PDF
-        resume_text = extract_text_from_resume(resume_content, resume_filename)
-        
-        # STEP 3: Create candidate record
-        candidate_data = {
+        # STEP 2: Persist the upload and queue the application. Extraction,
+        # the state merge and the confirmation email run on the ingestion
+        # workers (see process_application), with retries.
+        resume_file_hash = await run_blocking(put_blob_file, spooled_path)
+        application_id = await run_blocking(enqueue_application, job_id, {
             "name": name,
             "email": email,
             "phone": phone,
-            "resume": resume_text,
             "cover_letter": cover_letter,
             "linkedin_url": linkedin_url,
-            "applied_at": datetime.now().isoformat()
-        }
-        
-        # STEP 4: Add to workflow state
-        config = {"configurable": {"thread_id": job_id}}
-        current_state = graph_app.get_state(config)
-        
-        if not current_state.values:
-            # Initialize state if job exists but no state yet
-            candidates = [candidate_data]
-        else:
-            # Add to existing candidates
-            candidates = current_state.values.get('candidates', [])
-            candidates.append(candidate_data)
-        
-        # Update state
-        graph_app.update_state(
-            config,
-            {"candidates": candidates},
-            as_node="candidate_sourcer"
-        )
-        
-        print(f"✅ New application received from {name} for job {job_id}")
-        
-        # STEP 5: Send confirmation email
-        from tools.send_email_tool import send_email_tool
-        send_email_tool.invoke({
-            "recipient_email": email,
-            "subject": "Application Received",
-            "body": f"Dear {name},\n\nThank you for applying! We've received your application and will review it shortly.\n\nBest regards,\nHR Team"
+            "applied_at": datetime.now().isoformat(),
+            "resume_file_hash": resume_file_hash,
+            "resume_filename": resume_filename
         })
         
+        print(f"✅ New application queued from {name} for job {job_id} (application {application_id})")
+        
         # Success page
         success_html = f"""
         <!DOCTYPE html>
@@ -264,13 +338,14 @@ async def submit_application(
                 <h1>Application Submitted!</h1>
                 <p>Thank you, <strong>{name}</strong>!</p>
                 <p>We've received your application and will review it within 3-5 business days.</p>
-                <p>A confirmation email has been sent to <strong>{email}</strong></p>
+                <p>A confirmation email will be sent to <strong>{email}</strong></p>
+                <p><small>Application ID: <a href="/applications/{application_id}">{application_id}</a></small></p>
             </div>
         </body>
         </html>
         """
 
-        logger.info(f"Application successfully processed for {name}")
+        logger.info(f"Application successfully queued for {name}")
         return HTMLResponse(content=success_html, status_code=200)
 
     except ValidationException as ve:
@@ -281,39 +356,116 @@ async def submit_application(
         logger.error(f"Critical error processing application: {e}", exc_info=True)
         return HTMLResponse(content=f"<h1>Error</h1><p>{str(e)}</p>", status_code=500)
 
-def extract_text_from_resume(file_content: bytes, filename: str) -> str:
+async def spool_upload(upload: UploadFile) -> str:
     """
-    Extract text from resume file (PDF, DOC, DOCX).
+    Copies an upload into the blob store's spool directory chunk by chunk
+    and returns the file's path. Raises ValidationException (and removes
+    the partial file) if the magic bytes are wrong or the size limit is
+    crossed.
     """
+    fd, path = tempfile.mkstemp(dir=spool_dir(), suffix=".upload")
+    size = 0
     try:
-        if filename.endswith('.pdf'):
-            # Use PyPDF2 or pdfplumber
-            import io
-            from PyPDF2 import PdfReader
-            
-            pdf_file = io.BytesIO(file_content)
-            reader = PdfReader(pdf_file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text()
-            return text
-            
-        elif filename.endswith('.docx'):
-            # Use python-docx
-            import io
-            from docx import Document
-            
-            doc_file = io.BytesIO(file_content)
-            doc = Document(doc_file)
-            text = "\n".join([para.text for para in doc.paragraphs])
-            return text
-            
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if size == 0:
+                    validate_resume_header(upload.filename, chunk[:MAGIC_BYTES_LENGTH])
+                size += len(chunk)
+                validate_resume_file(upload.filename, size)
+                out.write(chunk)
+        if size == 0:
+            raise ValidationException("Resume file is empty.")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def process_application(item: Dict):
+    """
+    Ingestion worker handler: extracts the resume, merges the candidate into
+    the job's workflow state and sends the confirmation email. Each step is
+    recorded once done, so a retry after a failure does not repeat it.
+    """
+    payload = item["payload"]
+    job_id = item["job_id"]
+    name = payload["name"]
+    
+    if not item["merged"]:
+        resume_file_hash = payload["resume_file_hash"]
+        resume_text = extract_text_from_resume_file(
+            get_blob_path(resume_file_hash), payload["resume_filename"], digest=resume_file_hash
+        )
+        
+        # Resume text and file go to the blob store; state only carries
+        # their hashes and a preview
+        candidate_data = {
+            "name": name,
+            "email": payload["email"],
+            "phone": payload.get("phone"),
+            **store_resume(resume_text),
+            "resume_file_hash": resume_file_hash,
+            "cover_letter": payload.get("cover_letter"),
+            "linkedin_url": payload.get("linkedin_url"),
+            "applied_at": payload["applied_at"]
+        }
+        
+        # Through the shared normalize -> dedup -> merge stage; only a new or
+        # changed candidate is sent, and the `candidates` reducer merges it
+        # into whatever is already there
+        config = {"configurable": {"thread_id": job_id}}
+        
+        def merge(candidates):
+            with job_lock(job_id):
+                graph_app.update_state(
+                    config,
+                    {"candidates": candidates},
+                    as_node="candidate_sourcer"
+                )
+        
+        report = run_pipeline(job_id, [WebhookSource([candidate_data])], merge)
+        mark_step(item["id"], "merged")
+        if report["webhook"]["duplicate"]:
+            print(f"ℹ️  Duplicate application from {name} for job {job_id}; state unchanged")
         else:
-            return "Resume text extraction not supported for this format"
-            
-    except Exception as e:
-        print(f"Error extracting resume text: {e}")
-        return f"Resume uploaded: {filename} (text extraction failed)"
+            print(f"✅ New application received from {name} for job {job_id}")
+    
+    if not item["email_sent"]:
+        # Handed to the email outbox; the dispatcher sends it and retries
+        enqueue_emails([{
+            "key": f"application_received:{item['id']}",
+            "recipient_email": payload["email"],
+            "subject": "Application Received",
+            "body": f"Dear {name},\n\nThank you for applying! We've received your application and will review it shortly.\n\nBest regards,\nHR Team"
+        }])
+        mark_step(item["id"], "email_sent")
+
+@app.get("/metrics/email-outbox")
+async def email_outbox_metrics():
+    """Outbox backlog, send throughput and latency."""
+    return await run_blocking(outbox_metrics)
+
+@app.get("/metrics/llm-cache")
+async def llm_cache_metrics():
+    """Hit rates of the persistent LLM response cache, per agent."""
+    from llm_cache import cache_stats
+    return await run_blocking(cache_stats)
+
+@app.get("/applications/{application_id}")
+async def get_application_status_endpoint(application_id: str):
+    """Processing status of a submitted application."""
+    status = await run_blocking(get_application_status, application_id)
+    if status is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Application '{application_id}' not found"
+        )
+    return status
+
+# Started and stopped by lifespan()
+ingestion_workers = IngestionWorkerPool(process_application)
 
 @app.get("/webhook/offer-reply")
 async def handle_offer_reply_get(
@@ -373,53 +525,57 @@ async def handle_offer_reply_get(
         config = {"configurable": {"thread_id": job_id}}
         
         # ✅ Get current state to see what's actually stored
-        current_state = graph_app.get_state(config)
-        
-        print(f"\n📊 Current State Debug:")
-        print(f"  Next nodes: {current_state.next}")
-        print(f"  Has values: {bool(current_state.values)}")
-        print(f"  State keys: {list(current_state.values.keys()) if current_state.values else 'None'}")
-        print(f"  Offers sent: {current_state.values.get('offers_sent', 'N/A')}")
-        print(f"  Offer responses: {current_state.values.get('offer_responses', 'N/A')}")
-        
-        # Check if this is a valid workflow
-        if not current_state.values:
-            print(f"⚠️ State not found in memory for {job_id}. Attempting to restore from DB...")
-            from db import load_state
-            saved_state = load_state(job_id)
-            if saved_state:
-                print(f"✅ Restoring state from database...")
-                graph_app.update_state(config, saved_state)
+        def _record_reply():
+            with job_lock(job_id):
                 current_state = graph_app.get_state(config)
-            else:
-                raise Exception(f"No workflow found for job_id: {job_id}")
+                
+                print(f"\n📊 Current State Debug:")
+                print(f"  Next nodes: {current_state.next}")
+                print(f"  Has values: {bool(current_state.values)}")
+                print(f"  State keys: {list(current_state.values.keys()) if current_state.values else 'None'}")
+                print(f"  Offers sent: {current_state.values.get('offers_sent', 'N/A')}")
+                print(f"  Offer responses: {current_state.values.get('offer_responses', 'N/A')}")
+                
+                # Check if this is a valid workflow
+                if not current_state.values:
+                    print(f"⚠️ State not found in memory for {job_id}. Attempting to restore from DB...")
+                    from db import load_state
+                    saved_state = load_state(job_id)
+                    if saved_state:
+                        print(f"✅ Restoring state from database...")
+                        graph_app.update_state(config, saved_state)
+                        current_state = graph_app.get_state(config)
+                    else:
+                        raise Exception(f"No workflow found for job_id: {job_id}")
 
-        if 'offers_sent' not in current_state.values:
-            raise Exception(f"Invalid workflow state - no offers have been sent yet for job_id: {job_id}")
-        
-        # Update state with offer reply
-        print(f"\n✅ Updating state with reply from {candidate}: {reply}")
-        graph_app.update_state(
-            config,
-            {
-                "offer_reply": {
-                    "candidate": candidate,
-                    "status": reply
-                }
-            },
-            as_node="wait_for_offer_responses"  # ✅ Resume from this specific node
-        )
-        
-        # Resume the graph
-        print("Resuming workflow from wait_for_offer_responses node...")
-        for event in graph_app.stream(None, config):
-            if isinstance(event, dict):
-                print(f"  Processed: {list(event.keys())}")
-        
-        # Get final state
-        final_state = graph_app.get_state(config)
-        offers_sent = final_state.values.get('offers_sent', [])
-        offer_responses = final_state.values.get('offer_responses', [])
+                if 'offers_sent' not in current_state.values:
+                    raise Exception(f"Invalid workflow state - no offers have been sent yet for job_id: {job_id}")
+                
+                # Update state with offer reply
+                print(f"\n✅ Updating state with reply from {candidate}: {reply}")
+                graph_app.update_state(
+                    config,
+                    {
+                        "offer_reply": {
+                            "candidate": candidate,
+                            "status": reply
+                        }
+                    },
+                    as_node="wait_for_offer_responses"  # ✅ Resume from this specific node
+                )
+                
+                # Resume the graph
+                print("Resuming workflow from wait_for_offer_responses node...")
+                for event in graph_app.stream(None, config):
+                    if isinstance(event, dict):
+                        print(f"  Processed: {list(event.keys())}")
+                
+                # Get final state
+                final_state = graph_app.get_state(config)
+                offers_sent = final_state.values.get('offers_sent', [])
+                offer_responses = final_state.values.get('offer_responses', [])
+                return offers_sent, offer_responses
+        offers_sent, offer_responses = await run_blocking(_record_reply)
         
         # Return HTML response
         html_content = f"""
@@ -565,31 +721,35 @@ async def handle_offer_reply_post(payload: OfferReplyRequest):
         config = {"configurable": {"thread_id": job_id}}
         
         # Get current state first to see where we are
-        current_state = graph_app.get_state(config)
-        print(f"Current workflow state: {current_state}")
-        
-        print(f"\n✅ Updating state with reply from {candidate_name}: {reply}")
-        graph_app.update_state(
-            config,
-            {
-                "offer_reply": {
-                    "candidate": candidate_name,
-                    "status": reply
-                }
-            },
-            as_node="process_offer_reply" 
-        )
-        
-        # Resume execution
-        print("Resuming workflow with offer reply data...")
-        for event in graph_app.stream(None, config):
-            if isinstance(event, dict):
-                print(f"  Processed: {list(event.keys())}")
+        def _record_reply():
+            with job_lock(job_id):
+                current_state = graph_app.get_state(config)
+                print(f"Current workflow state: {current_state}")
                 
-        # Check final state
-        final_state = graph_app.get_state(config)
-        offers_sent = final_state.values.get('offers_sent', [])
-        offer_responses = final_state.values.get('offer_responses', [])
+                print(f"\n✅ Updating state with reply from {candidate_name}: {reply}")
+                graph_app.update_state(
+                    config,
+                    {
+                        "offer_reply": {
+                            "candidate": candidate_name,
+                            "status": reply
+                        }
+                    },
+                    as_node="process_offer_reply" 
+                )
+                
+                # Resume execution
+                print("Resuming workflow with offer reply data...")
+                for event in graph_app.stream(None, config):
+                    if isinstance(event, dict):
+                        print(f"  Processed: {list(event.keys())}")
+                
+                # Check final state
+                final_state = graph_app.get_state(config)
+                offers_sent = final_state.values.get('offers_sent', [])
+                offer_responses = final_state.values.get('offer_responses', [])
+                return offers_sent, offer_responses
+        offers_sent, offer_responses = await run_blocking(_record_reply)
         
         return {
             "status": "success",
@@ -614,7 +774,7 @@ async def get_workflow_status(job_id: str):
     """Get the current status of a workflow."""
     try:
         config = {"configurable": {"thread_id": job_id}}
-        state = graph_app.get_state(config)
+        state = await run_blocking(graph_app.get_state, config)
         
         if not state:
             raise HTTPException(
@@ -638,6 +798,65 @@ async def get_workflow_status(job_id: str):
             detail=f"Failed to retrieve workflow status: {str(e)}"
         )
 
+# Nodes the thread can be paused at while screening may still be re-run
+RESCREENABLE_NODES = {("resume_screener",), ("interviewer",)}
+
+@app.post("/jobs/{job_id}/rescreen")
+async def rescreen_job(job_id: str):
+    """
+    Pulls new applicants from the sourcing pull sources (Google Form, drop
+    folder), then screens those who arrived (or whose resume changed) since
+    the last screening pass and merges them into screened_candidates. Earlier
+    verdicts are reused, so this is cheap to call as applications come in.
+    Only allowed until HR has made interview selections.
+    """
+    from graph import screen_resumes
+    config = {"configurable": {"thread_id": job_id}}
+    
+    def _rescreen():
+        with job_lock(job_id):
+            state = graph_app.get_state(config)
+            if not state.values:
+                raise HTTPException(status_code=404, detail=f"Workflow with job_id '{job_id}' not found")
+            if tuple(state.next) not in RESCREENABLE_NODES or state.values.get("interview_selections"):
+                raise HTTPException(
+                    status_code=409,
+                    detail="Screening can only be re-run before interview selections are made"
+                )
+            # candidate_sourcer only runs once per job, so later form rows
+            # and dropped files are pulled here; they reach state in the same
+            # update as the screening results
+            existing = state.values.get("candidates") or []
+            present = {normalize_email(c.get("email")) for c in existing}
+            sourced, _ = collect_candidates(job_id, default_sources(), present=present)
+            values = {**state.values, "candidates": merge_candidates(existing, sourced)}
+            update = screen_resumes(values)
+            if update.get("error"):
+                # Leave the workflow where it is rather than routing it to END;
+                # unconfirmed sourced records are delivered again next time
+                raise HTTPException(status_code=422, detail=update["error"])
+            graph_app.update_state(config, {**update, "candidates": sourced}, as_node="resume_screener")
+            confirm_sources(job_id)
+            # Writing as resume_screener leaves the thread before
+            # interview_scheduler; run on so newly passed candidates are
+            # invited (outbox keys skip everyone already invited) and the
+            # thread pauses at the interviewer again
+            for _ in graph_app.stream(None, config):
+                pass
+            return {**update, "sourced": len(sourced)}
+    
+    update = await run_blocking(_rescreen)
+    results = update.get("screening_results", [])
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "new_applicants": update["sourced"],
+        "screened_candidates": len(update["screened_candidates"]),
+        "newly_screened": sum(1 for r in results if r["stage"] == "llm"),
+        "newly_passed": sum(1 for r in results if r["passed"]),
+        "prefiltered": sum(1 for r in results if r["stage"] == "prefilter"),
+    }
+
 @app.get("/webhook/onboarding")
 async def handle_onboarding_submission(
     job_id: str,
@@ -735,29 +954,32 @@ async def handle_onboarding_submission(
     # Process the submission (this runs when joining_date IS provided)
     try:
         config = {"configurable": {"thread_id": job_id}}
-        current_state = graph_app.get_state(config)
-        
-        if not current_state.values:
-            raise Exception(f"No workflow found for job_id: {job_id}")
-        
-        # Update state with onboarding submission
-        print(f"\n✅ Processing onboarding submission from {candidate}")
-        graph_app.update_state(
-            config,
-            {
-                "onboarding_submission": {
-                    "candidate": candidate,
-                    "joining_date": joining_date
-                }
-            },
-            as_node="wait_for_onboarding_submissions"
-        )
-        
-        # Resume the graph
-        print("Resuming workflow...")
-        for event in graph_app.stream(None, config):
-            if isinstance(event, dict):
-                print(f"  Processed: {list(event.keys())}")
+        def _record_submission():
+            with job_lock(job_id):
+                current_state = graph_app.get_state(config)
+                
+                if not current_state.values:
+                    raise Exception(f"No workflow found for job_id: {job_id}")
+                
+                # Update state with onboarding submission
+                print(f"\n✅ Processing onboarding submission from {candidate}")
+                graph_app.update_state(
+                    config,
+                    {
+                        "onboarding_submission": {
+                            "candidate": candidate,
+                            "joining_date": joining_date
+                        }
+                    },
+                    as_node="wait_for_onboarding_submissions"
+                )
+                
+                # Resume the graph
+                print("Resuming workflow...")
+                for event in graph_app.stream(None, config):
+                    if isinstance(event, dict):
+                        print(f"  Processed: {list(event.keys())}")
+        await run_blocking(_record_submission)
         
         # Success page (this is what should be shown AFTER submission)
         success_html = f"""
@@ -1088,144 +1310,129 @@ async def handle_onboarding_offer_form(
         config = {"configurable": {"thread_id": job_id}}
         
         # Get current state
-        current_state = graph_app.get_state(config)
-        
-        if not current_state.values:
-            print(f"⚠️ State not found in memory for {job_id}. Attempting to restore from DB...")
-            from db import load_state
-            saved_state = load_state(job_id)
-
-            if saved_state:
-                print(f"✅ Restoring state from database...")
-                graph_app.update_state(config, saved_state)
+        def _record_response():
+            with job_lock(job_id):
                 current_state = graph_app.get_state(config)
-            else:
-                raise Exception(f"No workflow found for job_id: {job_id}")
-        
-        print(f"\n{'='*70}")
-        print(f"📋 OFFER RESPONSE RECEIVED VIA FORM")
-        print(f"{'='*70}")
-        print(f"Job ID: {job_id}")
-        print(f"Candidate: {candidate}")
-        print(f"Decision: {decision}")
-        if joining_date:
-            print(f"Joining Date: {joining_date}")
-        if salary_expectation:
-            print(f"Salary Expectation: {salary_expectation}")
-        if comments:
-            print(f"Comments: {comments}")
-        print(f"{'='*70}\n")
-        
-        # ✅ CRITICAL FIX: Directly update offer_responses and onboarding_submissions
-        # Don't use the intermediate offer_reply field
-        
-        offers_sent = current_state.values.get('offers_sent', [])
-        offer_responses = current_state.values.get('offer_responses', [])
-        onboarding_submissions = current_state.values.get('onboarding_submissions', [])
-        
-        print(f"📊 Current state BEFORE update:")
-        print(f"   Offers sent: {offers_sent}")
-        print(f"   Responses: {len(offer_responses)}")
-        print(f"   Onboarding submissions: {len(onboarding_submissions)}")
-        
-        # Check if already responded
-        if any(r['candidate'] == candidate for r in offer_responses):
-            print(f"⚠️  {candidate} already responded - showing cached result")
-            # Still show success page
-        else:
-            # Build the response entry
-            if decision == "Accept":
-                response_entry = {"candidate": candidate, "status": "Accepted"}
-                
-                onboarding_entry = {
-                    "candidate": candidate,
-                    "joining_date": joining_date,
-                    "comments": comments if comments else ""
-                }
-                
-                # Add to lists
-                offer_responses.append(response_entry)
-                onboarding_submissions.append(onboarding_entry)
-                
-                # ✅ ADD THIS DEBUG OUTPUT
-                print(f"\n🔍 DEBUG: Data to be saved:")
-                print(f"   offer_responses: {offer_responses}")
-                print(f"   onboarding_submissions: {onboarding_submissions}")
                 
-                # Update the state
-                update_payload = {
-                    "offer_responses": offer_responses,
-                    "onboarding_submissions": onboarding_submissions
-                }
-                
-                print(f"\n📤 UPDATE PAYLOAD:")
-                print(json.dumps(update_payload, indent=2))
+                if not current_state.values:
+                    print(f"⚠️ State not found in memory for {job_id}. Attempting to restore from DB...")
+                    from db import load_state
+                    saved_state = load_state(job_id)
+
+                    if saved_state:
+                        print(f"✅ Restoring state from database...")
+                        graph_app.update_state(config, saved_state)
+                        current_state = graph_app.get_state(config)
+                    else:
+                        raise Exception(f"No workflow found for job_id: {job_id}")
                 
-                graph_app.update_state(config, update_payload, as_node="wait_for_offer_responses")
+                print(f"\n{'='*70}")
+                print(f"📋 OFFER RESPONSE RECEIVED VIA FORM")
+                print(f"{'='*70}")
+                print(f"Job ID: {job_id}")
+                print(f"Candidate: {candidate}")
+                print(f"Decision: {decision}")
+                if joining_date:
+                    print(f"Joining Date: {joining_date}")
+                if salary_expectation:
+                    print(f"Salary Expectation: {salary_expectation}")
+                if comments:
+                    print(f"Comments: {comments}")
+                print(f"{'='*70}\n")
                 
-                # ✅ VERIFY THE UPDATE WORKED
-                verify_state = graph_app.get_state(config)
-                print(f"\n✅ STATE AFTER UPDATE:")
-                print(f"   offer_responses: {verify_state.values.get('offer_responses')}")
-                print(f"   onboarding_submissions: {verify_state.values.get('onboarding_submissions')}")
+                # ✅ CRITICAL FIX: Directly update offer_responses and onboarding_submissions
+                # Don't use the intermediate offer_reply field
                 
-            elif decision == "Negotiate":
-                response_entry = {
-                    "candidate": candidate,
-                    "status": "Negotiation",
-                    "salary_expectation": salary_expectation if salary_expectation else "",
-                    "comments": comments if comments else ""
-                }
-                offer_responses.append(response_entry)
-                print(f"✅ Added negotiation request: {response_entry}")
+                offers_sent = current_state.values.get('offers_sent', [])
+                offer_responses = current_state.values.get('offer_responses', [])
+                onboarding_submissions = current_state.values.get('onboarding_submissions', [])
                 
-            else:  # Reject
-                response_entry = {
-                    "candidate": candidate,
-                    "status": "Rejected",
-                    "comments": comments if comments else ""
-                }
-                offer_responses.append(response_entry)
-                print(f"✅ Added rejection: {response_entry}")
-            
-            # ✅ Update the state DIRECTLY - bypass the offer_reply mechanism
-            update_payload = {
-                "offer_responses": offer_responses,
-                "onboarding_submissions": onboarding_submissions
-            }
-            
-            print(f"\n🔄 Updating LangGraph state directly...")
-            print(f"   New offer_responses count: {len(offer_responses)}")
-            print(f"   New onboarding_submissions count: {len(onboarding_submissions)}")
-            
-            # Update as if coming FROM wait_for_offer_responses (which set the interrupt)
-            graph_app.update_state(
-                config,
-                update_payload,
-                as_node="wait_for_offer_responses"
-            )
-            
-            # ✅ Check if all responses received
-            if len(offer_responses) >= len(offers_sent):
-                print(f"\n🎉 ALL CANDIDATES RESPONDED! Resuming workflow...")
+                print(f"📊 Current state BEFORE update:")
+                print(f"   Offers sent: {offers_sent}")
+                print(f"   Responses: {len(offer_responses)}")
+                print(f"   Onboarding submissions: {len(onboarding_submissions)}")
                 
-                # Resume the workflow - this should move past the NodeInterrupt
-                try:
-                    event_count = 0
-                    for event in graph_app.stream(None, config, stream_mode="values"):
-                        event_count += 1
-                        if event_count > 10:  # Safety limit
-                            break
-                        print(f"   Event {event_count}: {list(event.keys()) if isinstance(event, dict) else 'value update'}")
+                # Check if already responded
+                if any(r['candidate'] == candidate for r in offer_responses):
+                    print(f"⚠️  {candidate} already responded - showing cached result")
+                    # Still show success page
+                else:
+                    # Build the response entry
+                    new_submissions = []
+                    if decision == "Accept":
+                        response_entry = {"candidate": candidate, "status": "Accepted"}
+                        new_submissions.append({
+                            "candidate": candidate,
+                            "joining_date": joining_date,
+                            "comments": comments if comments else ""
+                        })
+                        print(f"✅ Added acceptance: {response_entry}")
+                    
+                    elif decision == "Negotiate":
+                        response_entry = {
+                            "candidate": candidate,
+                            "status": "Negotiation",
+                            "salary_expectation": salary_expectation if salary_expectation else "",
+                            "comments": comments if comments else ""
+                        }
+                        print(f"✅ Added negotiation request: {response_entry}")
                     
-                    print(f"✅ Workflow resumed - processed {event_count} events")
-                except Exception as resume_error:
-                    print(f"⚠️  Resume error (may be normal if workflow completed): {resume_error}")
-            else:
-                print(f"\n⏳ Still waiting for more responses ({len(offer_responses)}/{len(offers_sent)})")
+                    else:  # Reject
+                        response_entry = {
+                            "candidate": candidate,
+                            "status": "Rejected",
+                            "comments": comments if comments else ""
+                        }
+                        print(f"✅ Added rejection: {response_entry}")
+                    
+                    # ✅ Update the state DIRECTLY - bypass the offer_reply mechanism.
+                    # Only the new entries are sent; the state reducers merge them,
+                    # so concurrent responses from other candidates are not lost.
+                    update_payload = {
+                        "offer_responses": [response_entry],
+                        "onboarding_submissions": new_submissions
+                    }
+                    
+                    print(f"\n🔄 Updating LangGraph state directly...")
+                    print(json.dumps(update_payload, indent=2))
+                    
+                    # Update as if coming FROM wait_for_offer_responses (which set the interrupt)
+                    graph_app.update_state(
+                        config,
+                        update_payload,
+                        as_node="wait_for_offer_responses"
+                    )
+                    
+                    merged_state = graph_app.get_state(config)
+                    offer_responses = merged_state.values.get('offer_responses', [])
+                    # Offers the outbox gave up on are not waited for
+                    offers_sent = reconcile_offer_deliveries(merged_state.values)["offers_sent"]
+                    print(f"   offer_responses now: {len(offer_responses)}")
+                    print(f"   onboarding_submissions now: {len(merged_state.values.get('onboarding_submissions', []))}")
+                    
+                    # ✅ Check if all responses received
+                    if len(offer_responses) >= len(offers_sent):
+                        print(f"\n🎉 ALL CANDIDATES RESPONDED! Resuming workflow...")
+                        
+                        # Resume the workflow - this should move past the NodeInterrupt
+                        try:
+                            event_count = 0
+                            for event in graph_app.stream(None, config, stream_mode="values"):
+                                event_count += 1
+                                if event_count > 10:  # Safety limit
+                                    break
+                                print(f"   Event {event_count}: {list(event.keys()) if isinstance(event, dict) else 'value update'}")
+                            
+                            print(f"✅ Workflow resumed - processed {event_count} events")
+                        except Exception as resume_error:
+                            print(f"⚠️  Resume error (may be normal if workflow completed): {resume_error}")
+                    else:
+                        print(f"\n⏳ Still waiting for more responses ({len(offer_responses)}/{len(offers_sent)})")
+                return offers_sent
+        offers_sent = await run_blocking(_record_response)
         
         # Get final state for display
-        final_state = graph_app.get_state(config)
+        final_state = await run_blocking(graph_app.get_state, config)
         final_offer_responses = final_state.values.get('offer_responses', [])
         final_onboarding = final_state.values.get('onboarding_submissions', [])
         
@@ -1376,7 +1583,7 @@ async def debug_submissions(job_id: str):
     """Debug endpoint to see all submissions for a job."""
     try:
         config = {"configurable": {"thread_id": job_id}}
-        state = graph_app.get_state(config)
+        state = await run_blocking(graph_app.get_state, config)
         
         if not state.values:
             return HTMLResponse(content="<h1>No workflow found</h1>", status_code=404)
@@ -0,0 +1,111 @@
+import os
+import hashlib
+import tempfile
+from functools import lru_cache
+from typing import Dict, Optional
+
+from exceptions import WorkflowStateError
+
+# Content-addressed store for resume text and raw uploads. Graph state only
+# carries the SHA-256 digest plus a short preview; the bytes live here.
+BLOB_DIR = os.getenv("BLOB_STORE_DIR", "blobs")
+PREVIEW_CHARS = 280
+
+def _blob_path(digest: str) -> str:
+    # Two-level fan-out keeps directories small
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+def put_blob(data: bytes) -> str:
+    """Stores bytes once and returns their SHA-256 hex digest."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    if os.path.exists(path):
+        return digest
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temp file and rename, so readers never see a partial blob
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest
+
+def spool_dir() -> str:
+    """Scratch directory on the same filesystem, so spooled files can be renamed in."""
+    path = os.path.join(BLOB_DIR, "tmp")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def put_blob_file(path: str) -> str:
+    """
+    Moves a file (normally one written under spool_dir()) into the store
+    without reading it into memory, and returns its SHA-256 hex digest.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    target = _blob_path(digest)
+    if os.path.exists(target):
+        os.remove(path)
+        return digest
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+    return digest
+
+def get_blob_path(digest: str) -> str:
+    path = _blob_path(digest)
+    if not os.path.exists(path):
+        raise WorkflowStateError(f"Blob {digest} not found in {BLOB_DIR}")
+    return path
+
+def get_blob(digest: str) -> bytes:
+    try:
+        with open(_blob_path(digest), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        raise WorkflowStateError(f"Blob {digest} not found in {BLOB_DIR}")
+
+def put_text(text: str) -> str:
+    return put_blob(text.encode("utf-8"))
+
+@lru_cache(maxsize=512)
+def get_text(digest: str) -> str:
+    # Blobs are immutable, so caching by digest never goes stale
+    return get_blob(digest).decode("utf-8")
+
+def store_resume(text: str, raw_file: Optional[bytes] = None) -> Dict[str, str]:
+    """
+    Stores a resume and returns the fields that go into a Candidate in place
+    of the full text: resume_hash, resume_preview and (optionally) the hash
+    of the original upload.
+    """
+    text = text or ""
+    ref = {
+        "resume_hash": put_text(text),
+        "resume_preview": text[:PREVIEW_CHARS],
+    }
+    if raw_file is not None:
+        ref["resume_file_hash"] = put_blob(raw_file)
+    return ref
+
+def externalize_resume(candidate: Dict) -> Dict:
+    """Returns a copy of the candidate with inline resume text moved to the store."""
+    if candidate.get("resume_hash") or "resume" not in candidate:
+        return candidate
+    candidate = dict(candidate)
+    candidate.update(store_resume(str(candidate.pop("resume") or "")))
+    return candidate
+
+def load_resume(candidate: Dict) -> str:
+    """Full resume text for a candidate, whether stored by reference or inline."""
+    if candidate.get("resume_hash"):
+        return get_text(candidate["resume_hash"])
+    return candidate.get("resume") or ""
@@ -0,0 +1,430 @@
+import os
+import abc
+import csv
+import json
+import time
+import shutil
+import hashlib
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from blob_store import externalize_resume, load_resume
+from logging_config import setup_logger
+from near_duplicates import add_signatures, flag_near_duplicates, scope_for
+from resume_extraction import is_extraction_fallback
+
+logger = setup_logger("CandidatePipeline")
+
+# Every way a candidate reaches a job (webhook submissions, Google Form rows,
+# files dropped in CANDIDATE_DROP_DIR/<job_id>/) goes through one
+# normalize -> dedup -> merge stage. Dedup state lives in a persistent index
+# keyed on (job, normalized email) with a secondary index on the resume
+# (file hash for uploads, text hash otherwise), so each record costs one indexed lookup however large the import.
+# Near-duplicate resumes are flagged on the way (see near_duplicates.py).
+INDEX_DB = os.getenv("CANDIDATE_INDEX_PATH", "candidate_index.db")
+DROP_DIR = os.getenv("CANDIDATE_DROP_DIR", "candidate_drop")
+MERGE_BATCH_SIZE = int(os.getenv("PIPELINE_MERGE_BATCH_SIZE", "200"))
+# Short free-text answers ("Python, 3 years") are too common to treat a
+# matching hash as the same person; only longer resumes dedup by content
+DEDUP_MIN_RESUME_CHARS = int(os.getenv("DEDUP_MIN_RESUME_CHARS", "200"))
+
+# Accepted spellings of each field, across the form, CSV and JSONL sources
+FIELD_ALIASES = {
+    "name": ("name", "Name", "full_name", "Full Name"),
+    "email": ("email", "Email", "email id", "Email Address"),
+    "phone": ("phone", "Phone", "phone Number"),
+    "resume": ("resume", "Resume", "Resume/Experience", "resume_text"),
+    "cover_letter": ("cover_letter", "Cover Letter"),
+    "linkedin_url": ("linkedin_url", "LinkedIn"),
+    "applied_at": ("applied_at", "Timestamp"),
+}
+# Fields of an already-externalized resume, passed through as they are
+REF_FIELDS = ("resume_hash", "resume_preview", "resume_file_hash")
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(INDEX_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 30000")
+    _ensure_schema(conn)
+    return conn
+
+def _ensure_schema(conn: sqlite3.Connection):
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS candidate_index (
+                job_id TEXT NOT NULL,
+                email TEXT NOT NULL,           -- normalized
+                resume_hash TEXT NOT NULL,     -- resume key: file hash for uploads, else text hash
+                resume_chars INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (job_id, email)
+            );
+            CREATE INDEX IF NOT EXISTS idx_candidate_index_resume
+                ON candidate_index (job_id, resume_hash);
+            """
+        )
+        _schema_ready = True
+
+class CandidateSource(abc.ABC):
+    """A stream of raw candidate records for one job."""
+
+    name = "source"
+
+    @abc.abstractmethod
+    def records(self, job_id: str) -> Iterator[Dict]:
+        """Yields raw records (any of the FIELD_ALIASES spellings) for the job."""
+
+    def done(self, job_id: str):
+        """
+        Called after everything read from the source has been passed to
+        merge. Sources that remember what they delivered stage it here.
+        """
+
+    def confirm(self, job_id: str):
+        """
+        Called once the merged candidates are durable in the job's state
+        (see confirm_sources); only then may staged progress be committed,
+        so a lost update re-delivers the records.
+        """
+
+class WebhookSource(CandidateSource):
+    """Records pushed by the submit-application endpoint."""
+
+    name = "webhook"
+
+    def __init__(self, records: Iterable[Dict]):
+        self._records = records
+
+    def records(self, job_id: str) -> Iterator[Dict]:
+        return iter(self._records)
+
+class SheetsSource(CandidateSource):
+    """
+    Google Form responses added since the job's last confirmed sync. The
+    sheet watermark is staged in done() and committed in confirm().
+    """
+
+    name = "sheets"
+
+    def __init__(self, sheet_id: Optional[str] = None, client=None):
+        self.sheet_id = sheet_id or os.getenv("GOOGLE_FORM_SHEET_ID")
+        self.client = client
+        self._sync: Optional[Dict] = None
+
+    def records(self, job_id: str) -> Iterator[Dict]:
+        from tools.google_form_tool import read_new_form_responses
+        candidates, self._sync = read_new_form_responses(self.sheet_id, consumer=job_id, client=self.client)
+        return iter(candidates)
+
+    def done(self, job_id: str):
+        from tools.form_sync import stage_sync
+        if self._sync is not None:
+            stage_sync(self._sync)
+            self._sync = None
+
+    def confirm(self, job_id: str):
+        from tools.form_sync import confirm_sync
+        if confirm_sync(self.sheet_id, job_id):
+            logger.info(f"Committed Google Form watermark for job {job_id}")
+
+class DropFolderSource(CandidateSource):
+    """
+    CSV and JSONL files in <directory>/<job_id>/, read a row at a time.
+    Files move to staged/ once their candidates are merged and to
+    processed/ once those are checkpointed; staged files are read again
+    until then (dedup against state drops what already arrived).
+    """
+
+    name = "drop_folder"
+
+    def __init__(self, directory: str = DROP_DIR):
+        self.directory = directory
+        self._read: List[str] = []
+
+    @staticmethod
+    def _list(folder: str) -> List[str]:
+        if not os.path.isdir(folder):
+            return []
+        return sorted(
+            os.path.join(folder, f) for f in os.listdir(folder)
+            if f.lower().endswith((".csv", ".jsonl"))
+        )
+
+    def _files(self, job_id: str) -> List[str]:
+        folder = os.path.join(self.directory, job_id)
+        return self._list(os.path.join(folder, "staged")) + self._list(folder)
+
+    def _move(self, paths: List[str], folder: str):
+        os.makedirs(folder, exist_ok=True)
+        for path in paths:
+            target = os.path.join(folder, os.path.basename(path))
+            if os.path.exists(target):
+                # A re-dropped file of the same name must not replace one still staged
+                root, ext = os.path.splitext(target)
+                target = f"{root}.{time.time_ns()}{ext}"
+            shutil.move(path, target)
+
+    def records(self, job_id: str) -> Iterator[Dict]:
+        for path in self._files(job_id):
+            logger.info(f"Reading candidates from {path}")
+            with open(path, newline="", encoding="utf-8") as f:
+                if path.lower().endswith(".csv"):
+                    yield from csv.DictReader(f)
+                else:
+                    for line_number, line in enumerate(f, 1):
+                        if not line.strip():
+                            continue
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError as e:
+                            logger.warning(f"Skipping bad JSON in {path}:{line_number}: {e}")
+            self._read.append(path)
+
+    def done(self, job_id: str):
+        staged = os.path.join(self.directory, job_id, "staged")
+        self._move([p for p in self._read if os.path.dirname(p) != staged], staged)
+        self._read = []
+
+    def confirm(self, job_id: str):
+        folder = os.path.join(self.directory, job_id)
+        self._move(self._list(os.path.join(folder, "staged")), os.path.join(folder, "processed"))
+
+def default_sources() -> List[CandidateSource]:
+    """Pull sources for the sourcing step; webhook records are pushed instead."""
+    sources: List[CandidateSource] = []
+    if os.getenv("GOOGLE_FORM_SHEET_ID"):
+        sources.append(SheetsSource())
+    sources.append(DropFolderSource())
+    return sources
+
+def confirm_sources(job_id: str, sources: Optional[List[CandidateSource]] = None):
+    """
+    Commits what the pull sources staged for the job. Call once the merged
+    candidates have reached the job's checkpointed state.
+    """
+    for source in default_sources() if sources is None else sources:
+        try:
+            source.confirm(job_id)
+        except Exception as e:
+            logger.error(f"Could not confirm {source.name} for job {job_id}: {e}")
+
+def normalize_email(email: Optional[str]) -> str:
+    return (email or "").strip().lower()
+
+def _field(record: Dict, field: str) -> Optional[str]:
+    for alias in FIELD_ALIASES[field]:
+        value = record.get(alias)
+        if value not in (None, ""):
+            return str(value).strip() if field != "resume" else str(value)
+    return None
+
+def normalize(record: Dict) -> Optional[Tuple[Dict, str, int]]:
+    """
+    Maps a raw record to a Candidate and returns (candidate, resume_key,
+    resume_chars), or None if it lacks a name, email or resume. Inline
+    resume text stays inline until the candidate is merged.
+
+    resume_key identifies the resume for dedup: the original file's hash
+    for uploads (different files can extract to the same text, e.g. empty
+    scans), the text's hash otherwise. resume_chars is the length of the
+    text, or 0 for an extraction placeholder, which is never deduped on.
+    """
+    candidate = {field: _field(record, field) for field in FIELD_ALIASES}
+    candidate["email"] = normalize_email(candidate["email"])
+
+    if record.get("resume_hash"):
+        candidate.pop("resume")
+        candidate.update({f: record[f] for f in REF_FIELDS if record.get(f)})
+        text = load_resume(candidate)
+        if record.get("resume_file_hash"):
+            resume_key = f"file:{record['resume_file_hash']}"
+        else:
+            resume_key = record["resume_hash"]
+    elif candidate["resume"]:
+        text = candidate["resume"]
+        resume_key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    else:
+        return None
+
+    if not candidate["name"] or "@" not in candidate["email"]:
+        return None
+    resume_chars = 0 if is_extraction_fallback(text) else len(text)
+    return {k: v for k, v in candidate.items() if v is not None}, resume_key, resume_chars
+
+def _dedup(conn: sqlite3.Connection, job_id: str, chunk: List[Tuple[Dict, str, int]],
+           present: Optional[Set[str]]) -> List[Tuple[str, Dict, str, int]]:
+    """
+    Returns (decision, candidate, resume_key, resume_chars) for each record
+    that should be merged, decision being "new" or "updated". An email
+    already indexed with the same resume, or a long resume already indexed
+    under another email, is a duplicate. With `present` (the emails already
+    in state), index entries missing from state do not count, so a merge
+    that never reached state is retried.
+    """
+    def in_state(email: str) -> bool:
+        return present is None or email in present
+
+    batch_by_email: Dict[str, str] = {}
+    batch_by_resume: Dict[str, str] = {}
+    keep = []
+    for candidate, resume_hash, resume_chars in chunk:
+        email = candidate["email"]
+        dedup_on_resume = resume_chars >= DEDUP_MIN_RESUME_CHARS
+
+        if email in batch_by_email:
+            known_hash = batch_by_email[email]
+        else:
+            row = conn.execute(
+                "SELECT resume_hash FROM candidate_index WHERE job_id = ? AND email = ?", (job_id, email)
+            ).fetchone()
+            known_hash = row["resume_hash"] if row and in_state(email) else None
+        if known_hash == resume_hash:
+            continue
+
+        if dedup_on_resume and known_hash is None:
+            owner = batch_by_resume.get(resume_hash)
+            if owner is None:
+                row = conn.execute(
+                    "SELECT email FROM candidate_index WHERE job_id = ? AND resume_hash = ? AND resume_chars >= ? LIMIT 1",
+                    (job_id, resume_hash, DEDUP_MIN_RESUME_CHARS)
+                ).fetchone()
+                owner = row["email"] if row and in_state(row["email"]) else None
+            if owner is not None and owner != email:
+                logger.info(f"Duplicate resume for {email} (already applied as {owner}); skipped")
+                continue
+
+        batch_by_email[email] = resume_hash
+        if dedup_on_resume:
+            batch_by_resume.setdefault(resume_hash, email)
+        keep.append(("updated" if known_hash else "new", candidate, resume_hash, resume_chars))
+    return keep
+
+def _index(conn: sqlite3.Connection, job_id: str, source: str, kept: List[Tuple[str, Dict, str, int]]):
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            """
+            INSERT INTO candidate_index (job_id, email, resume_hash, resume_chars, source, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (job_id, email) DO UPDATE SET
+                resume_hash = excluded.resume_hash,
+                resume_chars = excluded.resume_chars,
+                source = excluded.source,
+                last_seen = excluded.last_seen
+            """,
+            [(job_id, c["email"], h, n, source, now, now) for _, c, h, n in kept]
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+def run_pipeline(job_id: str, sources: List[CandidateSource], merge: Callable[[List[Dict]], None],
+                 present: Optional[Set[str]] = None,
+                 batch_size: int = MERGE_BATCH_SIZE) -> Dict[str, Dict[str, int]]:
+    """
+    Streams every source's records through normalize -> dedup -> merge.
+    `merge` receives new or changed candidates (resumes externalized,
+    near-duplicates flagged) in batches of up to `batch_size`; a batch is
+    written to the dedup indexes only after merge returns. Returns
+    per-source counts.
+    """
+    report: Dict[str, Dict[str, int]] = {}
+    conn = _connect()
+    try:
+        for source in sources:
+            counts = report.setdefault(source.name, {"read": 0, "invalid": 0, "duplicate": 0, "near_duplicate": 0, "new": 0, "updated": 0})
+            chunk: List[Tuple[Dict, str, int]] = []
+
+            def flush():
+                kept = _dedup(conn, job_id, chunk, present)
+                counts["duplicate"] += len(chunk) - len(kept)
+                if kept:
+                    # Exact duplicates are gone; near-duplicates are flagged
+                    # and merged, and screening leaves them out
+                    signatures, flagged = flag_near_duplicates(
+                        job_id, [c for _, c, _, _ in kept], [load_resume(c) for _, c, _, _ in kept]
+                    )
+                    counts["near_duplicate"] += flagged
+                    merge([externalize_resume(c) for _, c, _, _ in kept])
+                    _index(conn, job_id, source.name, kept)
+                    add_signatures(scope_for(job_id), signatures)
+                    for decision, candidate, _, _ in kept:
+                        counts[decision] += 1
+                        if present is not None:
+                            present.add(candidate["email"])
+                chunk.clear()
+
+            for record in source.records(job_id):
+                counts["read"] += 1
+                normalized = normalize(record)
+                if normalized is None:
+                    counts["invalid"] += 1
+                    continue
+                chunk.append(normalized)
+                if len(chunk) >= batch_size:
+                    flush()
+            flush()
+            source.done(job_id)
+            logger.info(f"Ingested from {source.name} for job {job_id}: {counts}")
+    finally:
+        conn.close()
+    return report
+
+def collect_candidates(job_id: str, sources: List[CandidateSource],
+                       present: Optional[Set[str]] = None) -> Tuple[List[Dict], Dict[str, Dict[str, int]]]:
+    """run_pipeline into a list, for callers that return candidates as a state update."""
+    merged: List[Dict] = []
+    report = run_pipeline(job_id, sources, merged.extend, present=present)
+    return merged, report
+
+if __name__ == "__main__":
+    import tempfile
+
+    workdir = tempfile.mkdtemp()
+    INDEX_DB = os.path.join(workdir, "candidate_index.db")
+    import near_duplicates
+    near_duplicates.NEAR_DUP_INDEX_PATH = os.path.join(workdir, "near_duplicates.db")
+    os.environ.setdefault("BLOB_STORE_DIR", os.path.join(workdir, "blobs"))
+    import blob_store
+    blob_store.BLOB_DIR = os.environ["BLOB_STORE_DIR"]
+
+    job_folder = os.path.join(workdir, "drop", "job-1")
+    os.makedirs(job_folder)
+    n = 20000
+    with open(os.path.join(job_folder, "import.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Email", "Resume"])
+        for i in range(n):
+            # Every tenth row repeats an earlier applicant with different casing
+            j = i - 5 if i % 10 == 9 else i
+            writer.writerow([f"Applicant {j}", f"  Applicant{j}@Example.com", f"Resume of applicant {j}. " * 12])
+
+    seen = 0
+    def count(batch):
+        global seen
+        seen += len(batch)
+
+    start = time.perf_counter()
+    report = run_pipeline("job-1", [DropFolderSource(os.path.join(workdir, "drop"))], count)
+    elapsed = time.perf_counter() - start
+    print(f"{n} rows in {elapsed:.2f}s ({n / elapsed:.0f} rows/s): {report}, merged {seen}")
+
+    report = run_pipeline("job-1", [WebhookSource([{"name": "Applicant 3", "email": "applicant3@example.com",
+                                                   "resume": "Resume of applicant 3. " * 12}])], count)
+    print(f"webhook resubmission: {report}")
+    shutil.rmtree(workdir)
@@ -0,0 +1,261 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Iterator, Optional
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from logging_config import setup_logger
+
+logger = setup_logger("Checkpointer")
+
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db")
+POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+
+# Retention: latest N checkpoints per thread, plus every interrupt boundary
+CHECKPOINT_KEEP_LATEST = int(os.getenv("CHECKPOINT_KEEP_LATEST", "20"))
+CHECKPOINT_COMPACT_INTERVAL_HOURS = float(os.getenv("CHECKPOINT_COMPACT_INTERVAL_HOURS", "24"))
+
+# Channel LangGraph writes pending interrupts to (NodeInterrupt pauses)
+INTERRUPT_CHANNEL = "__interrupt__"
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """
+    WAL lets readers run alongside the single writer; busy_timeout makes a
+    writer wait for the lock instead of failing with "database is locked".
+    """
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+class SqliteConnectionPool:
+    """Fixed-size pool of SQLite connections, created lazily."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            # Connections move between threads, but only one thread holds one at a time
+            check_same_thread=False,
+        )
+        return configure_connection(conn)
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._new_connection()
+        return self._idle.get()
+
+    def release(self, conn: sqlite3.Connection):
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class PooledSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver that borrows a connection from a pool for each operation
+    instead of serializing every request on one shared connection.
+
+    The borrowed connection is bound to the calling thread for the duration
+    of the operation, so SqliteSaver's own `self.conn` references (and nested
+    cursors, e.g. in `list`) all see the same connection.
+    """
+
+    def __init__(self, pool: SqliteConnectionPool, *, serde=None):
+        self.pool = pool
+        self._local = threading.local()
+        super().__init__(conn=None, serde=serde)
+        with self.cursor(transaction=False):
+            pass  # runs setup() once, up front
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            raise RuntimeError("PooledSqliteSaver.conn used outside of cursor()")
+        return conn
+
+    @conn.setter
+    def conn(self, value):
+        # SqliteSaver.__init__ assigns a single connection; the pool replaces it
+        pass
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._local.conn = self.pool.acquire()
+        self._local.depth = depth + 1
+        conn = self._local.conn
+        try:
+            self.setup()
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                if transaction:
+                    conn.commit()
+                cur.close()
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self._local.conn = None
+                self.pool.release(conn)
+
+_checkpointer: Optional[PooledSqliteSaver] = None
+_checkpointer_lock = threading.Lock()
+
+def get_checkpointer() -> PooledSqliteSaver:
+    """Process-wide pooled checkpointer, created on first use."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = PooledSqliteSaver(SqliteConnectionPool(CHECKPOINT_DB))
+                logger.info(f"Checkpointer ready: {CHECKPOINT_DB} (pool size {POOL_SIZE})")
+    return _checkpointer
+
+@asynccontextmanager
+async def async_checkpointer(path: str = CHECKPOINT_DB):
+    """
+    Async checkpointer for use with ainvoke/astream/aget_state.
+
+    Usage:
+        async with async_checkpointer() as saver:
+            graph = build_graph(checkpointer=saver)
+    """
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    async with aiosqlite.connect(path, timeout=BUSY_TIMEOUT_MS / 1000) as conn:
+        await conn.execute("PRAGMA journal_mode = WAL")
+        await conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        await conn.execute("PRAGMA synchronous = NORMAL")
+        yield AsyncSqliteSaver(conn)
+
+def compact_checkpoints(
+    path: str = CHECKPOINT_DB,
+    keep_latest: int = CHECKPOINT_KEEP_LATEST,
+    vacuum: bool = True
+) -> dict:
+    """
+    Prunes checkpoint history: per thread, keeps the latest `keep_latest`
+    checkpoints and every checkpoint the workflow paused at, deletes the
+    rest along with their pending writes, then reclaims the space.
+
+    Returns counts of deleted rows and the file size before/after.
+    """
+    size_before = os.path.getsize(path) if os.path.exists(path) else 0
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        configure_connection(conn)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "checkpoints" not in tables:
+            return {"checkpoints_deleted": 0, "writes_deleted": 0, "size_before": size_before, "size_after": size_before}
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            checkpoints_deleted = conn.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT
+                            c.rowid AS rowid,
+                            ROW_NUMBER() OVER (
+                                PARTITION BY c.thread_id, c.checkpoint_ns
+                                ORDER BY c.checkpoint_id DESC
+                            ) AS rn,
+                            EXISTS (
+                                SELECT 1 FROM writes w
+                                WHERE w.thread_id = c.thread_id
+                                  AND w.checkpoint_ns = c.checkpoint_ns
+                                  AND w.checkpoint_id = c.checkpoint_id
+                                  AND w.channel = ?
+                            ) AS is_interrupt
+                        FROM checkpoints c
+                    )
+                    WHERE rn > ? AND NOT is_interrupt
+                )
+                """,
+                (INTERRUPT_CHANNEL, keep_latest)
+            ).rowcount
+            writes_deleted = conn.execute(
+                """
+                DELETE FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints c
+                    WHERE c.thread_id = writes.thread_id
+                      AND c.checkpoint_ns = writes.checkpoint_ns
+                      AND c.checkpoint_id = writes.checkpoint_id
+                )
+                """
+            ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if vacuum and checkpoints_deleted:
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+    result = {
+        "checkpoints_deleted": checkpoints_deleted,
+        "writes_deleted": writes_deleted,
+        "size_before": size_before,
+        "size_after": os.path.getsize(path),
+    }
+    logger.info(f"Checkpoint compaction: {result}")
+    return result
+
+def start_compaction_job(interval_hours: float = CHECKPOINT_COMPACT_INTERVAL_HOURS) -> Optional[threading.Thread]:
+    """Runs compact_checkpoints() every `interval_hours` in a daemon thread (0 disables)."""
+    if interval_hours <= 0:
+        return None
+
+    def _loop():
+        while True:
+            time.sleep(interval_hours * 3600)
+            try:
+                compact_checkpoints()
+            except Exception as e:
+                logger.error(f"Checkpoint compaction failed: {e}", exc_info=True)
+
+    thread = threading.Thread(target=_loop, name="checkpoint-compaction", daemon=True)
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    # Manual / cron run: python checkpointer.py
+    compact_checkpoints()
@@ -1,16 +1,109 @@
 import os
 import json
-from typing import Dict
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Tuple
 
+from exceptions import StaleStateError, WorkflowStateError
+from logging_config import setup_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process dev only
+    fcntl = None
+
+logger = setup_logger("DB")
+
+# Legacy whole-file JSON snapshot. Only read once, to migrate into STORE_FILE.
 DB_FILE = "hiring_workflows.json"
 
-def _ensure_db_exists():
-    if not os.path.exists(DB_FILE):
-        with open(DB_FILE, "w") as f:
-            json.dump({}, f)
+# One row per job, so reads and writes touch only the job they are about.
+# Keep it in a directory shared by every process that writes to it: SQLite
+# places its -wal/-shm files next to the database.
+STORE_FILE = os.getenv("WORKFLOW_STORE_PATH", "hiring_workflows.db")
+LOCK_FILE = STORE_FILE + ".lock"
 
-def _load_db() -> Dict:
-    _ensure_db_exists()
+_store_ready = False
+
+# Read-through LRU of serialized snapshots: job_id -> (version, payload, stamp).
+# An entry is served without touching SQLite while the store files' stamp is
+# unchanged; otherwise its version is re-checked before the payload is reused.
+# Keeping the JSON text rather than the dict means every caller gets its own
+# copy from one json.loads, which is cheaper than a deepcopy.
+CACHE_SIZE = int(os.getenv("WORKFLOW_CACHE_SIZE", "256"))
+_cache: "OrderedDict[str, Tuple[int, str, Optional[tuple]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+def _connect() -> sqlite3.Connection:
+    # isolation_level=None: transactions are opened explicitly by _transaction
+    conn = sqlite3.connect(STORE_FILE, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    """
+    Runs a write transaction. BEGIN IMMEDIATE takes the write lock up front,
+    so a read-check-write inside it cannot interleave with another process.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+@contextmanager
+def _file_lock():
+    """Advisory cross-process lock for one-off maintenance (schema, migration)."""
+    with open(LOCK_FILE, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _store_stamp() -> tuple:
+    """mtime/size of the store files; changes whenever any process commits."""
+    stamp = []
+    # In WAL mode commits land in the -wal file, checkpoints in the main file
+    for path in (STORE_FILE, STORE_FILE + "-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def _cache_put(job_id: str, version: int, payload: str, stamp: Optional[tuple]):
+    with _cache_lock:
+        _cache[job_id] = (version, payload, stamp)
+        _cache.move_to_end(job_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def cache_stats() -> Dict:
+    """Hit/miss counters for the load_state cache."""
+    with _cache_lock:
+        return {**_cache_stats, "size": len(_cache), "max_size": CACHE_SIZE}
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+        for key in _cache_stats:
+            _cache_stats[key] = 0
+
+def _load_json_db() -> Dict:
+    """Reads the legacy JSON snapshot file, if there is one."""
+    if not os.path.exists(DB_FILE):
+        return {}
     try:
         with open(DB_FILE, "r") as f:
             content = f.read().strip()
@@ -18,18 +111,151 @@ def _load_db() -> Dict:
                 return {}
             return json.loads(content)
     except json.JSONDecodeError as e:
-        print(f"Warning: Error decoding database file: {e}")
-        return {}
+        raise WorkflowStateError(f"Legacy database file {DB_FILE} is corrupt: {e}")
 
-def save_state(job_id: str, state: Dict):
-    """Saves the entire state for a given job ID."""
+def _migrate_json_db(conn: sqlite3.Connection):
+    """One-time copy of every job in the legacy JSON file into the store."""
+    if conn.execute("SELECT 1 FROM store_meta WHERE key = 'json_migrated'").fetchone():
+        return
+
+    try:
+        legacy = _load_json_db()
+    except WorkflowStateError as e:
+        # Leave the migration pending so it is retried once the file is fixed
+        logger.error(f"Skipping JSON migration: {e}")
+        return
+
+    now = datetime.now().isoformat()
+    with _transaction(conn):
+        # INSERT OR IGNORE keeps anything already written through save_state
+        conn.executemany(
+            "INSERT OR IGNORE INTO workflows (job_id, state, version, updated_at) VALUES (?, ?, 1, ?)",
+            [(job_id, json.dumps(state), now) for job_id, state in legacy.items()]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('json_migrated', ?)",
+            (now,)
+        )
+    if legacy:
+        logger.info(f"Migrated {len(legacy)} job(s) from {DB_FILE} into {STORE_FILE}")
+
+def _ensure_db_exists():
+    global _store_ready
+    if _store_ready:
+        return
+
+    with _file_lock():
+        conn = _connect()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS workflows (
+                    job_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS store_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                """
+            )
+            # Stores created before per-job versioning
+            try:
+                conn.execute("ALTER TABLE workflows ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            except sqlite3.OperationalError as e:
+                if "duplicate column name" not in str(e):
+                    raise
+            _migrate_json_db(conn)
+        finally:
+            conn.close()
+    _store_ready = True
+
+def save_state(job_id: str, state: Dict, expected_version: Optional[int] = None) -> int:
+    """
+    Saves the entire state for a given job ID and returns its new version.
+
+    If expected_version is given, the write only succeeds when the stored
+    version still matches it (0 meaning "job does not exist yet"); otherwise
+    StaleStateError is raised and nothing is written.
+    """
     _ensure_db_exists()
-    db = _load_db()
-    db[job_id] = state
-    with open(DB_FILE, "w") as f:
-        json.dump(db, f, indent=2)
+    payload = json.dumps(state)
+    conn = _connect()
+    try:
+        with _transaction(conn):
+            row = conn.execute(
+                "SELECT version FROM workflows WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            current_version = row[0] if row else 0
+
+            if expected_version is not None and expected_version != current_version:
+                raise StaleStateError(
+                    f"Job {job_id} is at version {current_version}, expected {expected_version}"
+                )
+
+            new_version = current_version + 1
+            conn.execute(
+                """
+                INSERT INTO workflows (job_id, state, version, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    state = excluded.state,
+                    version = excluded.version,
+                    updated_at = excluded.updated_at
+                """,
+                (job_id, payload, new_version, datetime.now().isoformat())
+            )
+    finally:
+        conn.close()
+    # Our own commit moved the stamp; leave it unset so the next read
+    # re-checks the version in case another process wrote right after us
+    _cache_put(job_id, new_version, payload, None)
+    return new_version
+
+def load_state_with_version(job_id: str) -> Tuple[Optional[Dict], int]:
+    """Loads the state for a job along with its version (0 if the job is unknown)."""
+    _ensure_db_exists()
+    stamp = _store_stamp()
+
+    with _cache_lock:
+        entry = _cache.get(job_id)
+        if entry and entry[2] == stamp:
+            _cache.move_to_end(job_id)
+            _cache_stats["hits"] += 1
+            return json.loads(entry[1]), entry[0]
+
+    conn = _connect()
+    try:
+        if entry:
+            # Store changed somewhere; only decode again if this job did
+            row = conn.execute(
+                "SELECT version FROM workflows WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row and row[0] == entry[0]:
+                _cache_put(job_id, entry[0], entry[1], stamp)
+                with _cache_lock:
+                    _cache_stats["revalidated"] += 1
+                return json.loads(entry[1]), entry[0]
+
+        row = conn.execute(
+            "SELECT state, version FROM workflows WHERE job_id = ?", (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+    with _cache_lock:
+        _cache_stats["misses"] += 1
+    if not row:
+        with _cache_lock:
+            _cache.pop(job_id, None)
+        return None, 0
+
+    _cache_put(job_id, row[1], row[0], stamp)
+    return json.loads(row[0]), row[1]
 
-def load_state(job_id: str) -> Dict:
+def load_state(job_id: str) -> Optional[Dict]:
     """Loads the state for a given job ID."""
-    db = _load_db()
-    return db.get(job_id)
\ No newline at end of file
+    state, _ = load_state_with_version(job_id)
+    return state
@@ -12,4 +12,8 @@ class WorkflowStateError(HRAgentException):
 
 class ValidationException(HRAgentException):
     """Raised when input validation fails."""
-    pass
\ No newline at end of file
+    pass
+
+class StaleStateError(WorkflowStateError):
+    """Raised when a job snapshot changed since it was read (optimistic versioning)."""
+    pass
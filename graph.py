@@ -3,21 +3,31 @@ import uuid
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 # StateGraph -> defines the entire structure of graph
-from langgraph.checkpoint.sqlite import SqliteSaver
+from checkpointer import get_checkpointer
 from tools.post_to_linkedin_tool import post_to_linkedin_tool
 from tools.schedule_interview_tool import schedule_interview_tool
-from tools.send_email_tool import send_email_tool
+from outbox import enqueue_emails, get_deliveries
 from langgraph.errors import NodeInterrupt
 import os
 from dotenv import load_dotenv
 from config import API_BASE_URL 
-import sqlite3
 from state import GraphState, Candidate, InterviewResult
-from tools.sourcing_tool import candidate_sourcing_tool
+from blob_store import externalize_resume
+from screening import (
+    SCREENING_INCREMENTAL, passed_from_results, plan_incremental_screening,
+    screen_candidates, screening_results
+)
+from agents.screener import ScreenedCandidates
+from ranking import prefilter_candidates
+from interview_kits import get_or_generate_kits, precompute_kits
+from near_duplicates import split_duplicates
+from candidate_pipeline import collect_candidates, confirm_sources, default_sources, normalize_email
 from agents.analyst import create_job_analyst_agent
 from agents.screener import create_resume_screener_agent
 from agents.interviewer import create_interviewer_agent
 from agents.decision_maker import create_decision_maker_agent
+from registry import ProcessRegistry
+from llm_cache import agent_llm
 
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_groq import ChatGroq
@@ -36,10 +46,28 @@ llm = ChatGroq(
     api_key=os.getenv("GROQ_API_KEY")  
 )
 
+# Agent chains and the compiled graph are built once per process and shared
+# by every node execution, API request and Streamlit session. Each agent's
+# LLM goes through the persistent response cache (see llm_cache.py).
+registry = ProcessRegistry()
+registry.register("job_analyst", lambda: create_job_analyst_agent(agent_llm(llm, "job_analyst")))
+registry.register("resume_screener", lambda: create_resume_screener_agent(agent_llm(llm, "resume_screener")))
+registry.register("interviewer", lambda: create_interviewer_agent(agent_llm(llm, "interviewer")))
+registry.register("decision_maker", lambda: create_decision_maker_agent(agent_llm(llm, "decision_maker")))
+registry.register("graph", lambda: build_graph())
+
+def get_agent(name: str):
+    """Shared agent chain: job_analyst, resume_screener, interviewer or decision_maker."""
+    return registry.get(name)
+
+def get_graph():
+    """Shared compiled graph on the default pooled checkpointer."""
+    return registry.get("graph")
+
 # using analyst agent for creating job description
 def run_job_analyst(state: GraphState):
     print("--- CREATING JOB DESCRIPTION ---")
-    agent = create_job_analyst_agent(llm)
+    agent = get_agent("job_analyst")
     job_description = agent.invoke({"user_request": state["initial_request"]})
     return {"job_description": json.dumps(job_description, indent=2)}
 
@@ -109,32 +137,41 @@ def post_job_description(state: GraphState):
 
 def run_candidate_sourcer(state: GraphState):
     """
-    Sources candidates - now uses real applications from LinkedIn.
+    Sources candidates: applications already in state (from webhook
+    submissions) plus new records from the pull sources (Google Form rows,
+    the drop folder), through the shared normalize -> dedup -> merge stage.
     """
     print("--- CHECKING FOR CANDIDATE APPLICATIONS ---")
     
     job_id = state.get("job_id", "UNKNOWN")
     
-    # Check if candidates already exist in state (from webhook submissions)
     existing_candidates = state.get("candidates", [])
-    
     if existing_candidates:
         print(f"✅ Found {len(existing_candidates)} applications already in system")
-        return {"candidates": existing_candidates}
     
-    # Otherwise, call the sourcing tool (which now reads from state)
-    candidates = candidate_sourcing_tool.invoke(job_id)
+    # Only new or changed candidates come back; the candidates reducer
+    # merges them by email into what is already in state
+    present = {normalize_email(c.get("email")) for c in existing_candidates}
+    new_candidates, report = collect_candidates(job_id, default_sources(), present=present)
     
-    if not candidates:
+    if not existing_candidates and not new_candidates:
         print("⚠️  No applications received yet.")
         print("💡 Candidates need to apply via the LinkedIn job posting.")
         return {"candidates": [], "error": "No candidates have applied yet. Please wait for applications."}
     
-    print(f"✅ Loaded {len(candidates)} real applicants")
-    return {"candidates": candidates}
+    print(f"✅ {len(existing_candidates)} existing + {len(new_candidates)} new applicants "
+          f"({sum(r['duplicate'] for r in report.values())} duplicates skipped)")
+    return {"candidates": [externalize_resume(c) for c in existing_candidates] + new_candidates}
 
 def run_resume_screener(state: GraphState):
     """Screen candidates against job requirements."""
+    # The sourcer's candidates are checkpointed by the time this node runs,
+    # so whatever the pull sources staged for it can be committed
+    confirm_sources(state.get("job_id", "UNKNOWN"))
+    return screen_resumes(state)
+
+def screen_resumes(state: GraphState):
+    """The screening step itself, also run by the rescreen endpoint."""
     logger.info("--- SCREENING RESUMES ---")
     
     # Validate we have candidates to screen
@@ -143,39 +180,46 @@ def run_resume_screener(state: GraphState):
         logger.warning("No candidates to screen")
         return {"error": "No candidates available for screening."}
     
-    agent = create_resume_screener_agent(llm)
-    
-    # Format candidates for the LLM
-    candidates_str = "\n\n".join([
-        f"=== CANDIDATE {i+1} ===\nName: {c['name']}\nResume: {c['resume']}"
-        for i, c in enumerate(candidates)
-    ])
-    print(candidates_str)
-    print(f"Screening {len(candidates)} candidates...")
+    agent = get_agent("resume_screener")
+    
+    # Near-duplicates of another applicant's resume (flagged at ingestion)
+    # are not screened again, as long as that applicant is still here
+    candidates, duplicates = split_duplicates(candidates)
+    if duplicates:
+        print(f"Skipping {len(duplicates)} near-duplicate application(s):")
+        for c in duplicates:
+            print(f"  ≈ {c['name']} ({c['email']}) ~ {c['duplicate_of']} ({c.get('duplicate_similarity')})")
+    
+    # Incremental: verdicts whose watermark (resume + JD version) is
+    # unchanged are reused; only new or changed candidates are screened
+    job_description = state["job_description"]
+    previous = (state.get("screening_results") or []) if SCREENING_INCREMENTAL else []
+    pending, current_results, watermarks = plan_incremental_screening(job_description, candidates, previous)
+    if current_results:
+        print(f"{len(current_results)} candidate(s) already screened for this job description; "
+              f"{len(pending)} new or changed")
+    
+    # BM25 pre-filter: obvious mismatches never reach the LLM
+    to_screen, prefilter = prefilter_candidates(job_description, pending)
+    print(f"Screening {len(to_screen)} of {len(pending)} candidates "
+          f"(~{prefilter['tokens_saved']} prompt tokens saved by pre-filter)...")
     
     try:
-        screened_results = agent.invoke({
-            "job_description": state["job_description"],
-            "candidates": candidates_str
-        })
-        print(screened_results)
-        if hasattr(screened_results, 'reasoning'):
-            print(f"\n--- SCREENING REASONING ---")
-            print(screened_results.reasoning)
+        # Sharded into token-budgeted batches screened concurrently; the
+        # returned names are mapped back to candidates per batch
+        if to_screen:
+            newly_passed, screened_results = screen_candidates(agent, job_description, to_screen)
+        else:
+            newly_passed, screened_results = [], ScreenedCandidates(reasoning="No new or changed candidates to screen.")
+        print(f"\n--- SCREENING REASONING ---")
+        print(screened_results.reasoning)
         
-        # Map passed candidate names to full candidate objects
-        all_candidates_map = {c['name']: c for c in candidates}
-        print(all_candidates_map)
-
-        passed_candidates = [
-            all_candidates_map[name] 
-            for name in screened_results.passed 
-            if name in all_candidates_map
-        ]
-        print(passed_candidates)
+        new_results = screening_results(pending, to_screen, newly_passed, watermarks)
+        passed_candidates = passed_from_results(candidates, current_results + new_results)
         
         # Log results
-        logger.info(f"Screening complete. Passed: {len(passed_candidates)}")
+        logger.info(f"Screening complete. Passed: {len(passed_candidates)} "
+                    f"({len(newly_passed)} newly screened)")
         candidate_word = "candidate" if len(passed_candidates) == 1 else "candidates"
         print(f"Passed: {len(passed_candidates)} {candidate_word}")
         for name in screened_results.passed:
@@ -188,9 +232,18 @@ def run_resume_screener(state: GraphState):
         
         if not passed_candidates:
             print("\n--- WARNING: NO CANDIDATES PASSED SCREENING ---")
-            return {"error": "No candidates passed the screening stage."}
+            return {"error": "No candidates passed the screening stage.", "screening_prefilter": prefilter,
+                    "screening_results": new_results}
         
-        return {"screened_candidates": passed_candidates}
+        # Start on the interview kits now, while the workflow waits for
+        # HR's interview selections
+        try:
+            precompute_kits(get_agent("interviewer"), state.get("job_id"), job_description, newly_passed)
+        except Exception as e:
+            logger.warning(f"Could not start interview kit precompute: {e}")
+        
+        return {"screened_candidates": passed_candidates, "screening_prefilter": prefilter,
+                "screening_results": new_results}
     
     except Exception as e:
         logger.error(f"Error during screening: {e}", exc_info=True)
@@ -205,6 +258,7 @@ def run_interview_scheduler(state: GraphState):
     # ✅ Your real Calendly link
     CALENDLY_LINK = "https://calendly.com/affanahmadbst/new-meeting"
     
+    invitations = []
     for candidate in state["screened_candidates"]:
         candidate_name = candidate["name"]
         candidate_email = candidate.get("email")  # ✅ Get email from candidate data
@@ -228,19 +282,21 @@ def run_interview_scheduler(state: GraphState):
             "Affan Ahmad\nHR Team"
         )
         
-        # Send the email
-        try:
-            result = send_email_tool.invoke({
-                "recipient_email": candidate_email,
-                "subject": subject,
-                "body": email_body
-            })
-            print(f"✅ {result}")
-        except Exception as e:
-            print(f"❌ Failed to send email to {candidate_name}: {e}")
+        invitations.append({
+            "key": f"interview_invitation:{job_id}:{candidate_email}",
+            "recipient_email": candidate_email,
+            "subject": subject,
+            "body": email_body
+        })
+    
+    # Written to the email outbox; the dispatcher process sends them. The
+    # keys make a re-run of this step a no-op.
+    deliveries = enqueue_emails(invitations)
+    for delivery in deliveries:
+        print(f"📬 Interview invitation to {delivery['recipient_email']}: {delivery['status']}")
 
     print("--- Interview invitations sent. Waiting for candidates to schedule. ---")
-    return {"job_id": job_id}
+    return {"job_id": job_id, "email_deliveries": deliveries}
 
 def process_interview_confirmation(state: GraphState):
     """Processes the confirmation that an interview has been scheduled."""
@@ -278,8 +334,15 @@ def run_interviewer(state: GraphState):
         print("â³ Waiting for interview feedback...")
         raise NodeInterrupt("Waiting for interview feedback")
     
-    # Process interviews with the provided feedback
-    interviewer_agent = create_interviewer_agent(llm)
+    # Process interviews with the provided feedback. Kits were usually
+    # precomputed after screening; any missing ones are generated
+    # concurrently, in screened_candidates order.
+    interviewer_agent = get_agent("interviewer")
+    selected = [c for c in screened_candidates if interview_selections.get(c['name'], "skip") == "yes"]
+    prep_kits = dict(zip(
+        (c['name'] for c in selected),
+        get_or_generate_kits(interviewer_agent, state.get("job_id"), state["job_description"], selected)
+    ))
     human_feedback_results = []
     
     for candidate in screened_candidates:
@@ -294,19 +357,20 @@ def run_interviewer(state: GraphState):
                 "recommendation": "Reject"
             })
         elif selection == "yes":
-            # Generate interview kit
-            prep_kit = interviewer_agent.invoke({
-                "job_description": state["job_description"],
-                "candidate_name": candidate_name,
-                "candidate_resume": candidate["resume"]
-            })
+            prep_kit = prep_kits[candidate_name]
+            if isinstance(prep_kit, Exception):
+                # Keep the candidate and their feedback; only the questions are missing
+                print(f"⚠️ Could not generate interview kit for {candidate_name}: {prep_kit}")
+                questions = []
+            else:
+                questions = prep_kit.questions
             
             # Get feedback from state
             feedback = interview_feedback.get(candidate_name, {})
             
             human_feedback_results.append({
                 "candidate_name": candidate_name,
-                "interview_questions": prep_kit.questions,
+                "interview_questions": questions,
                 "evaluation": feedback.get("evaluation", "No feedback provided"),
                 "recommendation": feedback.get("recommendation", "Reject")
             })
@@ -316,7 +380,7 @@ def run_interviewer(state: GraphState):
 # In graph.py - run_decision_maker function
 def run_decision_maker(state: GraphState):
     print("--- MAKING FINAL DECISION ---")
-    agent = create_decision_maker_agent(llm)
+    agent = get_agent("decision_maker")
     results_str = json.dumps(state["interview_results"], indent=2)
     
     # ✅ ADD THIS
@@ -367,7 +431,7 @@ def send_offers(state: GraphState):
     
     candidates_by_name = {c["name"]: c for c in state.get("screened_candidates", [])}
 
-    offers_sent = []
+    offers = []
     
     for name in final_shortlist:
         candidate = candidates_by_name.get(name)
@@ -397,36 +461,78 @@ def send_offers(state: GraphState):
             "HR Team"
         )
         
-        try:
-            result = send_email_tool.invoke({
-                "recipient_email": candidate_email,
-                "subject": subject,
-                "body": email_body
-            })
-            print(f"✅ {result}")
+        offers.append((name, {
+            "key": f"offer:{job_id}:{candidate_email}",
+            "recipient_email": candidate_email,
+            "subject": subject,
+            "body": email_body
+        }))
+    
+    deliveries = enqueue_emails([message for _, message in offers])
+    offers_sent = []
+    for (name, _), delivery in zip(offers, deliveries):
+        if delivery["status"] != "failed":
+            print(f"📬 Offer to {name} ({delivery['recipient_email']}): {delivery['status']}")
             offers_sent.append(name)
-        except Exception as e:
-            print(f"❌ Failed to send offer to {name}: {e}")
+        else:
+            print(f"❌ Offer to {name} could not be delivered: {delivery['error']}")
 
     print(f"\n--- Offers sent to {len(offers_sent)} candidates ---")
     
-    # Save state
-    from db import save_state
-    save_state(job_id, {
-        "offers_sent": offers_sent,
-        "offer_responses": [],
-        "job_description": state["job_description"],
-        "screened_candidates": state["screened_candidates"]
-    })
+    # Save state: merged into the job's snapshot, and only if nobody wrote
+    # it since we read it; on a conflict re-read and merge again
+    from db import load_state_with_version, save_state
+    from exceptions import StaleStateError
+    for attempt in range(3):
+        saved, version = load_state_with_version(job_id)
+        try:
+            save_state(job_id, {
+                **(saved or {}),
+                "offers_sent": offers_sent,
+                "offer_responses": [],
+                "job_description": state["job_description"],
+                "screened_candidates": state["screened_candidates"]
+            }, expected_version=version)
+            break
+        except StaleStateError as e:
+            logger.warning(f"Job snapshot changed while saving offers (attempt {attempt + 1}): {e}")
+    else:
+        logger.error(f"Could not save the offer snapshot for job {job_id}; the checkpoint still has it")
 
     return {
         "offers_sent": offers_sent,
-        "offer_responses": []
+        "offer_responses": [],
+        "email_deliveries": deliveries
     }
 
+def reconcile_offer_deliveries(state: GraphState):
+    """
+    Reads the outbox's current status for every offer email, so state sees
+    what the dispatcher finally did rather than the status at enqueue time.
+    Candidates whose offer permanently failed are dropped from offers_sent
+    (unless they replied anyway), so the workflow does not wait on them.
+    Returns the offers_sent / email_deliveries update.
+    """
+    job_id = state.get("job_id", "unknown")
+    offers_sent = state.get("offers_sent") or []
+    emails = {c["name"]: c.get("email") for c in state.get("screened_candidates") or []}
+    keys = {name: f"offer:{job_id}:{emails[name]}" for name in offers_sent if emails.get(name)}
+    deliveries = get_deliveries(list(keys.values()))
+    failed = {d["key"]: d for d in deliveries if d["status"] == "failed"}
+    responded = {r["candidate"] for r in state.get("offer_responses") or []}
+    
+    still_sent = []
+    for name in offers_sent:
+        if keys.get(name) in failed and name not in responded:
+            print(f"❌ Offer to {name} could not be delivered: {failed[keys[name]]['error']}; not waiting for a reply")
+        else:
+            still_sent.append(name)
+    return {"offers_sent": still_sent, "email_deliveries": deliveries}
+
 def wait_for_offer_responses(state: GraphState):
     """Pause workflow until all candidates respond."""
-    offers_sent = state.get("offers_sent", [])
+    reconciled = reconcile_offer_deliveries(state)
+    offers_sent = reconciled["offers_sent"]
     offer_responses = state.get("offer_responses", [])
     
     responded_candidates = [r['candidate'] for r in offer_responses]
@@ -447,15 +553,19 @@ def wait_for_offer_responses(state: GraphState):
     
     # All responded - don't interrupt, just continue
     print("✅ All candidates have responded! Proceeding to route_final_decision...")
-    return {}
+    return reconciled
 
 def process_offer_reply(state: GraphState):
     """Process a single candidate's offer reply."""
     reply_data = state.get("offer_reply")
     
+    # The edge after this node compares responses with offers_sent, so it
+    # must not count offers the outbox has given up on
+    reconciled = reconcile_offer_deliveries(state)
+    
     if not reply_data:
         print("⏸️ No new offer reply - workflow is waiting")
-        return {}
+        return reconciled
     
     candidate_name = reply_data['candidate']
     status = reply_data['status']
@@ -482,7 +592,7 @@ def process_offer_reply(state: GraphState):
     # Check for duplicates
     if any(r['candidate'] == candidate_name for r in offer_responses):
         print(f"⚠️  Duplicate response from {candidate_name} - ignoring")
-        return {}
+        return reconciled
     
     # Add new response with full data
     response_entry = {
@@ -497,13 +607,12 @@ def process_offer_reply(state: GraphState):
     elif status == "Rejected":
         response_entry["comments"] = reply_data.get("comments")
     
-    offer_responses.append(response_entry)
-    
     # Show progress
-    offers_sent = state.get("offers_sent", [])
-    print(f"📊 Progress: {len(offer_responses)}/{len(offers_sent)} responses received")
+    offers_sent = reconciled["offers_sent"]
+    print(f"📊 Progress: {len(offer_responses) + 1}/{len(offers_sent)} responses received")
     
     # ✅ For acceptances, also store in onboarding_submissions list
+    new_submissions = []
     if status == "Accepted":
         onboarding_submissions = state.get("onboarding_submissions", [])
         onboarding_data = state.get("onboarding_submission")
@@ -511,14 +620,16 @@ def process_offer_reply(state: GraphState):
         if onboarding_data and onboarding_data.get("candidate") == candidate_name:
             # Check if not already in list
             if not any(s['candidate'] == candidate_name for s in onboarding_submissions):
-                onboarding_submissions.append(onboarding_data)
+                new_submissions.append(onboarding_data)
                 print(f"✅ Added {candidate_name} to onboarding_submissions list")
     
+    # Only the new entries: the state reducers merge them into the lists
     # Clear the offer_reply so it doesn't get processed again
     return {
-        "offer_responses": offer_responses,
+        **reconciled,
+        "offer_responses": [response_entry],
         "offer_reply": None,
-        "onboarding_submissions": onboarding_submissions if status == "Accepted" else state.get("onboarding_submissions", []),
+        "onboarding_submissions": new_submissions,
         "last_offer_reply": status
     }
 
@@ -583,7 +694,7 @@ def process_all_acceptances(state: GraphState):
     print(f"📧 Email lookup built for: {list(candidate_emails.keys())}")
     print(f"🔍 Name variations: {candidate_name_variations}")
     
-    confirmations_sent = []
+    confirmations = []
     
     for acceptance in acceptances:
         candidate_name = acceptance['candidate']
@@ -634,19 +745,21 @@ def process_all_acceptances(state: GraphState):
             f"Best regards,\nHR Team"
         )
         
-        try:
-            from tools.send_email_tool import send_email_tool
-            send_email_tool.invoke({
-                "recipient_email": candidate_email,
-                "subject": subject,
-                "body": body
-            })
-            print(f"✅ Confirmation sent to {candidate_name} at {candidate_email}")
+        confirmations.append((candidate_name, {
+            "key": f"welcome:{state.get('job_id')}:{candidate_email}",
+            "recipient_email": candidate_email,
+            "subject": subject,
+            "body": body
+        }))
+    
+    deliveries = enqueue_emails([message for _, message in confirmations])
+    confirmations_sent = []
+    for (candidate_name, _), delivery in zip(confirmations, deliveries):
+        if delivery["status"] != "failed":
+            print(f"📬 Confirmation to {candidate_name} at {delivery['recipient_email']}: {delivery['status']}")
             confirmations_sent.append(candidate_name)
-        except Exception as e:
-            print(f"❌ Failed to send confirmation to {candidate_name}: {e}")
-            import traceback
-            traceback.print_exc()
+        else:
+            print(f"❌ Confirmation to {candidate_name} could not be delivered: {delivery['error']}")
     
     print(f"\n{'='*70}")
     print(f"🎉 HIRING PROCESS COMPLETE!")
@@ -656,7 +769,8 @@ def process_all_acceptances(state: GraphState):
     
     return {
         "hiring_status": "complete",
-        "confirmations_sent": confirmations_sent
+        "confirmations_sent": confirmations_sent,
+        "email_deliveries": deliveries
     }
 
 def wait_for_onboarding_submissions(state: GraphState):
@@ -708,16 +822,14 @@ def process_onboarding_submission(state: GraphState):
         print(f"⚠️  Duplicate submission from {candidate_name} - ignoring")
         return {}
     
-    # Add new submission
-    onboarding_submissions.append({
-        "candidate": candidate_name,
-        "joining_date": joining_date
-    })
-    
     print(f"✅ Onboarding info recorded for {candidate_name}")
     
+    # Add new submission (merged into the list by the state reducer)
     return {
-        "onboarding_submissions": onboarding_submissions,
+        "onboarding_submissions": [{
+            "candidate": candidate_name,
+            "joining_date": joining_date
+        }],
         "onboarding_submission": None
     }
 
@@ -732,6 +844,7 @@ def send_final_confirmations(state: GraphState):
         "Bob Smith": "imaffan99@gmail.com",
     }
     
+    confirmations = []
     for submission in onboarding_submissions:
         candidate_name = submission['candidate']
         joining_date = submission['joining_date']
@@ -754,18 +867,19 @@ def send_final_confirmations(state: GraphState):
                 f"HR Team"
             )
             
-            try:
-                result = send_email_tool.invoke({
-                    "recipient_email": candidate_email,
-                    "subject": subject,
-                    "body": email_body
-                })
-                print(f"✅ {result}")
-            except Exception as e:
-                print(f"❌ Failed to send confirmation to {candidate_name}: {e}")
+            confirmations.append({
+                "key": f"start_date:{state.get('job_id')}:{candidate_email}",
+                "recipient_email": candidate_email,
+                "subject": subject,
+                "body": email_body
+            })
+    
+    deliveries = enqueue_emails(confirmations)
+    for delivery in deliveries:
+        print(f"📬 Start date confirmation to {delivery['recipient_email']}: {delivery['status']}")
     
     print("🎉 HIRING PROCESS COMPLETE!")
-    return {"hiring_status": "complete"}
+    return {"hiring_status": "complete", "email_deliveries": deliveries}
 
 def handle_all_rejections(state: GraphState):
     """Handle no acceptances."""
@@ -809,12 +923,15 @@ def should_continue(state: GraphState):
         return "end"
     return "continue"
 
-def build_graph():
-    """Build the complete workflow graph."""
-    conn = sqlite3.connect("checkpoints.db", check_same_thread=False)
-    
-    # Pass the connection to the SqliteSaver constructor
-    memory = SqliteSaver(conn=conn)
+def build_graph(checkpointer=None):
+    """
+    Build the complete workflow graph.
+
+    Uses the process-wide pooled SQLite checkpointer unless one is passed in
+    (e.g. from checkpointer.async_checkpointer() for the async graph APIs).
+    Most callers want get_graph(), which compiles this once per process.
+    """
+    memory = checkpointer or get_checkpointer()
     workflow = StateGraph(GraphState)
 
     # ✅ Add ALL nodes FIRST (including onboarding nodes)
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from logging_config import setup_logger
+
+logger = setup_logger("IngestionQueue")
+
+# Durable work queue for job applications. The submit endpoint only inserts
+# a row here; worker threads do extraction, the state merge and the
+# confirmation email, retrying with backoff.
+QUEUE_DB = os.getenv("INGESTION_QUEUE_PATH", "ingestion_queue.db")
+WORKERS = int(os.getenv("INGESTION_WORKERS", "4"))
+MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("INGESTION_RETRY_BASE_SECONDS", "5"))
+# A claimed item whose worker died is handed out again after this long
+LEASE_SECONDS = float(os.getenv("INGESTION_LEASE_SECONDS", "300"))
+POLL_SECONDS = 0.5
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(QUEUE_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 30000")
+    _ensure_schema(conn)
+    return conn
+
+def _ensure_schema(conn: sqlite3.Connection):
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS applications (
+                id TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,          -- queued | processing | done | failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                merged INTEGER NOT NULL DEFAULT 0,
+                email_sent INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                available_at REAL NOT NULL,
+                lease_until REAL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_applications_ready
+                ON applications (status, available_at);
+            CREATE INDEX IF NOT EXISTS idx_applications_job
+                ON applications (job_id);
+            """
+        )
+        _schema_ready = True
+
+def enqueue_application(job_id: str, payload: Dict) -> str:
+    """Persists an application for background processing and returns its id."""
+    application_id = str(uuid.uuid4())
+    now = datetime.now().isoformat()
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            INSERT INTO applications (id, job_id, payload, status, available_at, created_at, updated_at)
+            VALUES (?, ?, ?, 'queued', ?, ?, ?)
+            """,
+            (application_id, job_id, json.dumps(payload), time.time(), now, now)
+        )
+    finally:
+        conn.close()
+    return application_id
+
+def claim_next() -> Optional[Dict]:
+    """Atomically takes the oldest ready item (or one whose lease expired)."""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT * FROM applications
+                WHERE (status = 'queued' AND available_at <= ?)
+                   OR (status = 'processing' AND lease_until < ?)
+                ORDER BY available_at
+                LIMIT 1
+                """,
+                (now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE applications SET status = 'processing', lease_until = ?, updated_at = ? WHERE id = ?",
+                (now + LEASE_SECONDS, datetime.now().isoformat(), row["id"])
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    item = dict(row)
+    item["payload"] = json.loads(item["payload"])
+    return item
+
+def mark_step(application_id: str, step: str):
+    """Records a completed side effect (merged / email_sent) so retries skip it."""
+    if step not in ("merged", "email_sent"):
+        raise ValueError(f"Unknown step: {step}")
+    conn = _connect()
+    try:
+        conn.execute(
+            f"UPDATE applications SET {step} = 1, updated_at = ? WHERE id = ?",
+            (datetime.now().isoformat(), application_id)
+        )
+    finally:
+        conn.close()
+
+def mark_done(application_id: str):
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE applications SET status = 'done', lease_until = NULL, last_error = NULL, updated_at = ? WHERE id = ?",
+            (datetime.now().isoformat(), application_id)
+        )
+    finally:
+        conn.close()
+
+def mark_failed(application_id: str, attempts: int, error: str):
+    """Schedules a retry with exponential backoff, or gives up after MAX_ATTEMPTS."""
+    attempts += 1
+    status = "failed" if attempts >= MAX_ATTEMPTS else "queued"
+    available_at = time.time() + RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            UPDATE applications
+            SET status = ?, attempts = ?, last_error = ?, available_at = ?, lease_until = NULL, updated_at = ?
+            WHERE id = ?
+            """,
+            (status, attempts, error, available_at, datetime.now().isoformat(), application_id)
+        )
+    finally:
+        conn.close()
+
+def get_application_status(application_id: str) -> Optional[Dict]:
+    conn = _connect()
+    try:
+        row = conn.execute(
+            """
+            SELECT id, job_id, status, attempts, merged, email_sent, last_error, created_at, updated_at
+            FROM applications WHERE id = ?
+            """,
+            (application_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    status = dict(row)
+    status["merged"] = bool(status["merged"])
+    status["email_sent"] = bool(status["email_sent"])
+    return status
+
+class IngestionWorkerPool:
+    """Daemon threads that drain the queue through `handler(item)`."""
+
+    def __init__(self, handler: Callable[[Dict], None], workers: int = WORKERS):
+        self.handler = handler
+        self.workers = workers
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"ingestion-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} ingestion worker(s) on {QUEUE_DB}")
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                item = claim_next()
+            except Exception as e:
+                logger.error(f"Could not claim from ingestion queue: {e}", exc_info=True)
+                self._stop.wait(POLL_SECONDS)
+                continue
+
+            if item is None:
+                self._stop.wait(POLL_SECONDS)
+                continue
+
+            try:
+                self.handler(item)
+                mark_done(item["id"])
+            except Exception as e:
+                logger.warning(f"Application {item['id']} failed (attempt {item['attempts'] + 1}): {e}")
+                mark_failed(item["id"], item["attempts"], str(e))
@@ -0,0 +1,158 @@
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
+from agents.interviewer import InterviewEvaluation
+from blob_store import load_resume
+from checkpointer import SqliteConnectionPool
+from logging_config import setup_logger
+
+logger = setup_logger("InterviewKits")
+
+# Interview kits are generated concurrently, at most this many LLM calls at once
+INTERVIEW_MAX_CONCURRENCY = int(os.getenv("INTERVIEW_MAX_CONCURRENCY", "5"))
+
+# Kits are generated speculatively as soon as screening finishes, while the
+# workflow waits for HR's selections, and kept in this store until needed.
+INTERVIEW_PRECOMPUTE = os.getenv("INTERVIEW_PRECOMPUTE", "true").lower() == "true"
+KIT_STORE_PATH = os.getenv("INTERVIEW_KIT_STORE_PATH", "interview_kits.db")
+
+_pool: Optional[SqliteConnectionPool] = None
+_pool_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=INTERVIEW_MAX_CONCURRENCY, thread_name_prefix="kit-precompute")
+# Kits being generated in this process, so a lookup waits instead of asking twice
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+def kit_input(job_description: str, candidate: Dict) -> Dict:
+    return {
+        "job_description": job_description,
+        "candidate_name": candidate["name"],
+        "candidate_resume": load_resume(candidate)
+    }
+
+def generate_kits(agent, job_description: str, candidates: List[Dict],
+                  max_concurrency: int = INTERVIEW_MAX_CONCURRENCY) -> List[Union[InterviewEvaluation, Exception]]:
+    """
+    Generates one interview kit per candidate, in the same order. A failed
+    generation comes back as its exception instead of failing the others.
+    """
+    if not candidates:
+        return []
+    logger.info(f"Generating {len(candidates)} interview kit(s), up to {max_concurrency} at a time")
+    results = agent.batch(
+        [kit_input(job_description, c) for c in candidates],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True
+    )
+    for candidate, result in zip(candidates, results):
+        if isinstance(result, Exception):
+            logger.error(f"Interview kit generation failed for {candidate['name']}: {result}")
+    return results
+
+def _get_pool() -> SqliteConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SqliteConnectionPool(KIT_STORE_PATH)
+            with _pool.connection() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS interview_kits (
+                        key TEXT PRIMARY KEY,
+                        job_id TEXT,
+                        candidate TEXT,
+                        kit TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.commit()
+        return _pool
+
+def kit_key(job_id: str, job_description: str, candidate: Dict) -> str:
+    """Same job, same job description and same resume -> same kit."""
+    resume_hash = candidate.get("resume_hash") or hashlib.sha256(load_resume(candidate).encode("utf-8")).hexdigest()
+    jd_hash = hashlib.sha256((job_description or "").encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{job_id}|{jd_hash}|{candidate['name']}|{resume_hash}".encode("utf-8")).hexdigest()
+
+def get_kit(key: str) -> Optional[InterviewEvaluation]:
+    with _get_pool().connection() as conn:
+        row = conn.execute("SELECT kit FROM interview_kits WHERE key = ?", (key,)).fetchone()
+    return InterviewEvaluation.model_validate_json(row[0]) if row else None
+
+def put_kit(key: str, job_id: str, candidate_name: str, kit: InterviewEvaluation):
+    with _get_pool().connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO interview_kits (key, job_id, candidate, kit, created_at) VALUES (?, ?, ?, ?, ?)",
+            (key, job_id, candidate_name, kit.model_dump_json(), time.time())
+        )
+        conn.commit()
+
+def _generate_and_store(agent, key: str, job_id: str, job_description: str, candidate: Dict) -> InterviewEvaluation:
+    try:
+        kit = agent.invoke(kit_input(job_description, candidate))
+        put_kit(key, job_id, candidate["name"], kit)
+        return kit
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def precompute_kits(agent, job_id: str, job_description: str, candidates: List[Dict]) -> int:
+    """
+    Starts generating kits for candidates that have none yet, in the
+    background, and returns how many were scheduled. Does not wait.
+    """
+    if not INTERVIEW_PRECOMPUTE:
+        return 0
+    scheduled = 0
+    for candidate in candidates:
+        key = kit_key(job_id, job_description, candidate)
+        with _inflight_lock:
+            if key in _inflight:
+                continue
+            if get_kit(key) is not None:
+                continue
+            _inflight[key] = _executor.submit(_generate_and_store, agent, key, job_id, job_description, candidate)
+        scheduled += 1
+    if scheduled:
+        logger.info(f"Precomputing {scheduled} interview kit(s) for job {job_id}")
+    return scheduled
+
+def get_or_generate_kits(agent, job_id: str, job_description: str,
+                         candidates: List[Dict]) -> List[Union[InterviewEvaluation, Exception]]:
+    """
+    Kits for `candidates` in order: precomputed ones from the store, ones
+    still being precomputed are awaited, and the rest are generated now
+    (concurrently, with per-candidate errors as in generate_kits).
+    """
+    results: List[Union[InterviewEvaluation, Exception, None]] = [None] * len(candidates)
+    keys = [kit_key(job_id, job_description, c) for c in candidates]
+    missing = []
+
+    for i, key in enumerate(keys):
+        with _inflight_lock:
+            future = _inflight.get(key)
+        if future is not None:
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.warning(f"Precomputed kit for {candidates[i]['name']} failed, retrying: {e}")
+                missing.append(i)
+            continue
+        kit = get_kit(key)
+        if kit is not None:
+            results[i] = kit
+        else:
+            missing.append(i)
+
+    logger.info(f"Interview kits: {len(candidates) - len(missing)} precomputed, {len(missing)} to generate")
+    generated = generate_kits(agent, job_description, [candidates[i] for i in missing])
+    for i, kit in zip(missing, generated):
+        results[i] = kit
+        if not isinstance(kit, Exception):
+            put_kit(keys[i], job_id, candidates[i]["name"], kit)
+    return results
@@ -0,0 +1,180 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import warnings
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+from checkpointer import SqliteConnectionPool
+from logging_config import setup_logger
+
+logger = setup_logger("LLMCache")
+
+warnings.filterwarnings("ignore", message=r"The function `(loads|dumps)` is in beta")
+
+# All agents call the LLM at temperature=0, so a response can be reused for
+# the same model, prompt and output schema (the schema travels in
+# llm_string as the bound tool / response format).
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))  # 0 = never expire
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+# Comma-separated agent names that always call the LLM
+LLM_CACHE_DISABLED_AGENTS = {
+    name.strip() for name in os.getenv("LLM_CACHE_DISABLED_AGENTS", "").split(",") if name.strip()
+}
+
+_pool: Optional[SqliteConnectionPool] = None
+_pool_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+def _get_pool() -> SqliteConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SqliteConnectionPool(LLM_CACHE_PATH)
+            with _pool.connection() as conn:
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        agent TEXT,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access);
+                    """
+                )
+                conn.commit()
+        return _pool
+
+def normalize_prompt(prompt: str) -> str:
+    """Whitespace differences don't change what the model is asked."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\x00{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+def _count(agent: str, field: str, n: int = 1):
+    with _stats_lock:
+        counters = _stats.setdefault(agent, {"hits": 0, "misses": 0, "writes": 0, "evictions": 0})
+        counters[field] += n
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Persistent LangChain LLM cache with TTL and size-based LRU eviction.
+    One instance per agent so hit rates can be reported per agent; all
+    instances share the same table.
+    """
+
+    def __init__(self, agent: str = "default",
+                 ttl_hours: float = LLM_CACHE_TTL_HOURS,
+                 max_mb: float = LLM_CACHE_MAX_MB):
+        self.agent = agent
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with _get_pool().connection() as conn:
+            row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+            if row is None:
+                _count(self.agent, "misses")
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            conn.commit()
+
+        try:
+            value = loads(row[0], allowed_objects="core")
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry for {self.agent}: {e}")
+            _count(self.agent, "misses")
+            return None
+        _count(self.agent, "hits")
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        value = dumps(return_val)
+        now = time.time()
+        with _get_pool().connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache (key, agent, value, size, created_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, self.agent, value, len(value), now, now)
+            )
+            conn.commit()
+            _count(self.agent, "writes")
+            self._evict(conn, now)
+
+    def _evict(self, conn, now: float):
+        """Drops expired rows, then least recently used ones down to 90% of the size cap."""
+        evicted = 0
+        if self.ttl_seconds:
+            evicted += conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.9)
+            for key, size in conn.execute(
+                "SELECT key, size FROM llm_cache ORDER BY last_access"
+            ).fetchall():
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        conn.commit()
+        if evicted:
+            _count(self.agent, "evictions", evicted)
+
+    def clear(self, **kwargs: Any) -> None:
+        with _get_pool().connection() as conn:
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+def agent_llm(llm, agent: str):
+    """
+    The LLM an agent chain should use: `llm` with this agent's cache
+    attached, or `llm` unchanged if caching is off for it.
+    """
+    if not LLM_CACHE_ENABLED or agent in LLM_CACHE_DISABLED_AGENTS:
+        return llm
+    return llm.model_copy(update={"cache": SQLiteLLMCache(agent)})
+
+def cache_stats() -> Dict[str, Any]:
+    """Per-agent hit/miss/write/eviction counts for this process, plus table totals."""
+    with _stats_lock:
+        agents = {name: dict(counters) for name, counters in _stats.items()}
+    for counters in agents.values():
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else None
+
+    entries, size = 0, 0
+    if LLM_CACHE_ENABLED:
+        with _get_pool().connection() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+    return {
+        "enabled": LLM_CACHE_ENABLED,
+        "disabled_agents": sorted(LLM_CACHE_DISABLED_AGENTS),
+        "entries": entries,
+        "size_mb": round(size / (1024 * 1024), 3),
+        "agents": agents,
+    }
@@ -0,0 +1,109 @@
+import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+from exceptions import WorkflowStateError
+from logging_config import setup_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+logger = setup_logger("Locks")
+
+# One lock file per job. flock() is honoured across processes (uvicorn
+# workers, the Streamlit container) as long as they share this directory.
+LOCK_DIR = os.getenv("JOB_LOCK_DIR", "locks")
+LOCK_TIMEOUT_SECONDS = float(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", "120"))
+_POLL_SECONDS = 0.05
+
+class KeyedLockManager:
+    """
+    Hands out one exclusive lock per key. Holders of different keys never
+    wait on each other; holders of the same key are serialized, whether
+    they are threads in this process or other processes.
+
+    Re-entrant per thread, so a helper that takes the lock can be called
+    from code that already holds it.
+    """
+
+    def __init__(self, lock_dir: str = LOCK_DIR):
+        self.lock_dir = lock_dir
+        self._thread_locks: Dict[str, threading.RLock] = {}
+        self._thread_locks_guard = threading.Lock()
+        self._held = threading.local()
+
+    def _thread_lock(self, key: str) -> threading.RLock:
+        with self._thread_locks_guard:
+            lock = self._thread_locks.get(key)
+            if lock is None:
+                lock = self._thread_locks[key] = threading.RLock()
+            return lock
+
+    def _lock_path(self, key: str) -> str:
+        # Hash so any job_id is a safe file name
+        return os.path.join(self.lock_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".lock")
+
+    def _flock(self, f, key: str, deadline: float):
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise WorkflowStateError(f"Timed out waiting for the lock on job {key}")
+                time.sleep(_POLL_SECONDS)
+
+    @contextmanager
+    def lock(self, key: str, timeout: float = LOCK_TIMEOUT_SECONDS):
+        held = getattr(self._held, "keys", None)
+        if held is None:
+            held = self._held.keys = {}
+
+        if key in held:
+            # Already ours on this thread
+            held[key] += 1
+            try:
+                yield
+            finally:
+                held[key] -= 1
+            return
+
+        deadline = time.monotonic() + timeout
+        thread_lock = self._thread_lock(key)
+        if not thread_lock.acquire(timeout=timeout):
+            raise WorkflowStateError(f"Timed out waiting for the lock on job {key}")
+        try:
+            if fcntl is None:
+                held[key] = 1
+                try:
+                    yield
+                finally:
+                    del held[key]
+                return
+
+            os.makedirs(self.lock_dir, exist_ok=True)
+            with open(self._lock_path(key), "a") as f:
+                started = time.monotonic()
+                self._flock(f, key, deadline)
+                waited = time.monotonic() - started
+                if waited > 1:
+                    logger.info(f"Waited {waited:.1f}s for the lock on job {key}")
+                held[key] = 1
+                try:
+                    yield
+                finally:
+                    del held[key]
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        finally:
+            thread_lock.release()
+
+job_locks = KeyedLockManager()
+
+def job_lock(job_id: str, timeout: float = LOCK_TIMEOUT_SECONDS):
+    """Serializes read-modify-write of one job's workflow state."""
+    return job_locks.lock(job_id, timeout=timeout)
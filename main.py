@@ -1,8 +1,8 @@
 import uuid
 # In Python terminal or a test script:
-from graph import build_graph
+from graph import get_graph
 
-graph_app = build_graph()
+graph_app = get_graph()
 config = {"configurable": {"thread_id": "400b158a-e493-4cb6-80ed-50395eca88fa"}}
 
 # Check current state
@@ -0,0 +1,272 @@
+import os
+import re
+import zlib
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from logging_config import setup_logger
+
+logger = setup_logger("NearDuplicates")
+
+# Near-duplicate resumes (a repeat applicant under a new email, copy-pasted
+# resumes) are found with MinHash signatures over word shingles and an LSH
+# index on signature bands. LSH only proposes candidates; a match needs an
+# estimated Jaccard similarity of at least NEAR_DUP_THRESHOLD, so the
+# threshold can be tuned without re-indexing.
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+# "job" compares applicants within one job; "global" across all jobs
+NEAR_DUP_SCOPE = os.getenv("NEAR_DUP_SCOPE", "job")
+NEAR_DUP_INDEX_PATH = os.getenv("NEAR_DUP_INDEX_PATH", "near_duplicates.db")
+# Resumes shorter than this many words are not compared at all
+NEAR_DUP_MIN_WORDS = int(os.getenv("NEAR_DUP_MIN_WORDS", "40"))
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# 32 bands of 4 rows: pairs above ~0.45 similarity almost always share a band
+BANDS, ROWS = 32, 4
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures are persisted, so the permutations must never change
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 32) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 32) - 1, size=NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(NEAR_DUP_INDEX_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    _ensure_schema(conn)
+    return conn
+
+def _ensure_schema(conn: sqlite3.Connection):
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                PRIMARY KEY (scope, key)
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                scope TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (scope, bucket, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_lsh_buckets_key ON lsh_buckets (scope, key);
+            """
+        )
+        _schema_ready = True
+
+def scope_for(job_id: str) -> str:
+    return "global" if NEAR_DUP_SCOPE == "global" else f"job:{job_id}"
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature of the text's word 5-shingles, or None if the text is too short."""
+    words = _WORD.findall((text or "").lower())
+    if len(words) < NEAR_DUP_MIN_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # Universal hashing (a*x + b) mod p, as in datasketch; uint64 wrap-around is intended
+    permuted = ((np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+def _buckets(sig: np.ndarray) -> List[int]:
+    # One signed 64-bit id per band, so SQLite stores it as an INTEGER
+    return [
+        int.from_bytes(
+            hashlib.blake2b(band.to_bytes(1, "little") + sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            "little", signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+def find_near_duplicates(scope: str, items: List[Tuple[str, Optional[np.ndarray]]],
+                         threshold: Optional[float] = None) -> List[Optional[Tuple[str, float]]]:
+    """
+    For each (key, signature) returns the most similar other key at or above
+    the threshold, with its similarity, or None. Items are compared against
+    the persisted index and against earlier items in the same list.
+    """
+    threshold = NEAR_DUP_THRESHOLD if threshold is None else threshold
+    results: List[Optional[Tuple[str, float]]] = []
+    pending_buckets: Dict[int, List[str]] = {}
+    pending_sigs: Dict[str, np.ndarray] = {}
+    conn = _connect()
+    try:
+        for key, sig in items:
+            if sig is None:
+                results.append(None)
+                continue
+            buckets = _buckets(sig)
+            # No DISTINCT: it steers SQLite onto the (scope, key) index
+            candidates = {row[0] for row in conn.execute(
+                f"SELECT key FROM lsh_buckets WHERE scope = ? AND bucket IN ({','.join('?' * len(buckets))})",
+                [scope, *buckets]
+            )}
+            for bucket in buckets:
+                candidates.update(pending_buckets.get(bucket, ()))
+            candidates.discard(key)
+
+            best = None
+            for other in candidates:
+                other_sig = pending_sigs.get(other)
+                if other_sig is None:
+                    row = conn.execute(
+                        "SELECT signature FROM signatures WHERE scope = ? AND key = ?", (scope, other)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    other_sig = np.frombuffer(row[0], dtype=np.uint32)
+                score = similarity(sig, other_sig)
+                if score >= threshold and (best is None or score > best[1]):
+                    best = (other, score)
+            results.append(best)
+
+            pending_sigs[key] = sig
+            for bucket in buckets:
+                pending_buckets.setdefault(bucket, []).append(key)
+    finally:
+        conn.close()
+    return results
+
+def add_signatures(scope: str, items: List[Tuple[str, Optional[np.ndarray]]]):
+    """Indexes (key, signature) pairs, replacing any earlier signature for the same key."""
+    items = [(key, sig) for key, sig in items if sig is not None]
+    if not items:
+        return
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, sig in items:
+                conn.execute("DELETE FROM lsh_buckets WHERE scope = ? AND key = ?", (scope, key))
+                conn.execute(
+                    "INSERT OR REPLACE INTO signatures (scope, key, signature) VALUES (?, ?, ?)",
+                    (scope, key, sig.tobytes())
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO lsh_buckets (scope, bucket, key) VALUES (?, ?, ?)",
+                    [(scope, bucket, key) for bucket in _buckets(sig)]
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+def flag_near_duplicates(job_id: str, candidates: List[Dict], texts: List[str]) -> Tuple[List[Tuple[str, Optional[np.ndarray]]], int]:
+    """
+    Sets duplicate_of / duplicate_similarity on candidates whose resume is a
+    near-duplicate of another applicant's (keyed by email), in place.
+    Returns the signatures to index once the candidates are merged, and how
+    many were flagged.
+    """
+    if not NEAR_DUP_ENABLED or not candidates:
+        return [], 0
+    scope = scope_for(job_id)
+    items = [(c["email"], signature(text)) for c, text in zip(candidates, texts)]
+    flagged = 0
+    for candidate, match in zip(candidates, find_near_duplicates(scope, items)):
+        if match is None:
+            continue
+        other, score = match
+        candidate["duplicate_of"] = other
+        candidate["duplicate_similarity"] = round(score, 3)
+        flagged += 1
+        logger.info(f"{candidate['email']} looks like a duplicate of {other} (similarity {score:.2f})")
+    return items, flagged
+
+def split_duplicates(candidates: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Splits candidates into (kept, duplicates). A candidate is a duplicate when
+    following duplicate_of leads to another candidate in the list. Flags can
+    form a cycle (B was flagged against A, then A resubmitted and matched B);
+    the member of a cycle listed first is kept rather than dropping them all.
+    """
+    by_email = {(c.get("email") or "").lower(): c for c in candidates}
+    order = {email: i for i, email in enumerate(by_email)}
+    roots: Dict[str, str] = {}
+
+    def root(email: str) -> str:
+        path: List[str] = []
+        while True:
+            if email in roots:
+                found = roots[email]
+                break
+            target = by_email[email].get("duplicate_of")
+            if target not in by_email or target == email:
+                found = email
+                break
+            if email in path:
+                found = min(path[path.index(email):], key=order.get)
+                break
+            path.append(email)
+            email = target
+        for visited in path:
+            roots[visited] = found
+        return found
+
+    kept, duplicates = [], []
+    for candidate in candidates:
+        email = (candidate.get("email") or "").lower()
+        (kept if root(email) == email else duplicates).append(candidate)
+    return kept, duplicates
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    NEAR_DUP_INDEX_PATH = os.path.join(tempfile.mkdtemp(), "near_duplicates.db")
+    random.seed(7)
+    vocabulary = [f"skill{i}" for i in range(3000)]
+    n, copies = 3000, 100
+    resumes = [" ".join(random.choices(vocabulary, k=250)) for _ in range(n)]
+    # Copies change a name and a few words, as a re-submission would
+    near = []
+    for i in random.sample(range(n), copies):
+        words = resumes[i].split()
+        for j in random.sample(range(len(words)), 5):
+            words[j] = random.choice(vocabulary)
+        near.append((i, " ".join(words)))
+
+    start = time.perf_counter()
+    sigs = [(f"applicant{i}@example.com", signature(text)) for i, text in enumerate(resumes)]
+    add_signatures("bench", sigs)
+    indexed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matches = find_near_duplicates("bench", [(f"copy{i}@example.com", signature(text)) for i, text in near])
+    found = sum(1 for (i, _), m in zip(near, matches) if m and m[0] == f"applicant{i}@example.com")
+    false = find_near_duplicates("bench", [(f"new{i}@example.com", signature(" ".join(random.choices(vocabulary, k=250))))
+                                           for i in range(copies)])
+    query = time.perf_counter() - start
+    print(f"Indexed {n} resumes in {indexed:.2f}s; {copies} + {copies} queries in {query:.2f}s")
+    print(f"Near-duplicates found: {found}/{copies}; false matches: {sum(1 for m in false if m)}/{copies}")
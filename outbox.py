@@ -0,0 +1,250 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from logging_config import setup_logger
+
+logger = setup_logger("EmailOutbox")
+
+# Graph nodes and API handlers never talk to Gmail directly: they record an
+# email intent here and a separate dispatcher process (python outbox.py)
+# sends it. The dedup key makes a retried step a no-op instead of a second
+# email.
+OUTBOX_DB = os.getenv("EMAIL_OUTBOX_PATH", "email_outbox.db")
+DISPATCH_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+RETRY_BASE_SECONDS = float(os.getenv("EMAIL_OUTBOX_RETRY_BASE_SECONDS", "30"))
+LEASE_SECONDS = float(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "1"))
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(OUTBOX_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 30000")
+    _ensure_schema(conn)
+    return conn
+
+def _ensure_schema(conn: sqlite3.Connection):
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedup_key TEXT NOT NULL UNIQUE,
+                recipient_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL,          -- queued | sending | sent | failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                message_id TEXT,
+                last_error TEXT,
+                available_at REAL NOT NULL,
+                lease_until REAL,
+                created_at REAL NOT NULL,
+                sent_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_ready ON outbox (status, available_at);
+            CREATE INDEX IF NOT EXISTS idx_outbox_sent ON outbox (sent_at);
+            """
+        )
+        _schema_ready = True
+
+def _delivery(row: sqlite3.Row) -> Dict:
+    """The shape graph state keeps in email_deliveries."""
+    at = row["sent_at"] or row["created_at"]
+    return {
+        "key": row["dedup_key"],
+        "recipient_email": row["recipient_email"],
+        "subject": row["subject"],
+        "status": row["status"],
+        "message_id": row["message_id"],
+        "error": row["last_error"],
+        "at": datetime.fromtimestamp(at).isoformat(),
+    }
+
+def enqueue_emails(messages: List[Dict]) -> List[Dict]:
+    """
+    Records email intents (dicts with key, recipient_email, subject, body)
+    in one transaction and returns their delivery entries, in order. A key
+    that is already in the outbox is left as it is, whatever its status.
+    """
+    if not messages:
+        return []
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for m in messages:
+                conn.execute(
+                    """
+                    INSERT OR IGNORE INTO outbox
+                        (dedup_key, recipient_email, subject, body, status, available_at, created_at)
+                    VALUES (?, ?, ?, ?, 'queued', ?, ?)
+                    """,
+                    (m.get("key") or m["recipient_email"], m["recipient_email"], m["subject"], m["body"], now, now)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return get_deliveries([m.get("key") or m["recipient_email"] for m in messages], conn=conn)
+    finally:
+        conn.close()
+
+def get_deliveries(keys: List[str], conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """Current delivery entries for the given dedup keys, in order (unknown keys are skipped)."""
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        rows = {}
+        for key in keys:
+            row = conn.execute("SELECT * FROM outbox WHERE dedup_key = ?", (key,)).fetchone()
+            if row is not None:
+                rows[key] = _delivery(row)
+        return [rows[k] for k in keys if k in rows]
+    finally:
+        if own:
+            conn.close()
+
+def claim_batch(limit: int = DISPATCH_BATCH_SIZE) -> List[Dict]:
+    """Atomically leases up to `limit` ready emails (or ones whose lease expired)."""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                """
+                SELECT * FROM outbox
+                WHERE (status = 'queued' AND available_at <= ?)
+                   OR (status = 'sending' AND lease_until < ?)
+                ORDER BY available_at
+                LIMIT ?
+                """,
+                (now, now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = 'sending', lease_until = ? WHERE id = ?",
+                [(now + LEASE_SECONDS, row["id"]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+def mark_sent(outbox_id: int, message_id: Optional[str]):
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE outbox SET status = 'sent', message_id = ?, last_error = NULL, lease_until = NULL, sent_at = ? WHERE id = ?",
+            (message_id, time.time(), outbox_id)
+        )
+    finally:
+        conn.close()
+
+def mark_failed(outbox_id: int, attempts: int, error: str):
+    """Schedules a retry with exponential backoff, or gives up after MAX_ATTEMPTS."""
+    attempts += 1
+    status = "failed" if attempts >= MAX_ATTEMPTS else "queued"
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            UPDATE outbox
+            SET status = ?, attempts = ?, last_error = ?, available_at = ?, lease_until = NULL
+            WHERE id = ?
+            """,
+            (status, attempts, error, time.time() + RETRY_BASE_SECONDS * (2 ** (attempts - 1)), outbox_id)
+        )
+    finally:
+        conn.close()
+
+def outbox_metrics() -> Dict:
+    """Backlog by status, plus throughput and queue-to-send latency."""
+    now = time.time()
+    conn = _connect()
+    try:
+        by_status = {row["status"]: row["n"] for row in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM outbox GROUP BY status"
+        )}
+        last_minute, last_hour, avg_latency = conn.execute(
+            """
+            SELECT
+                SUM(CASE WHEN sent_at >= ? THEN 1 ELSE 0 END),
+                COUNT(*),
+                AVG(sent_at - created_at)
+            FROM outbox WHERE status = 'sent' AND sent_at >= ?
+            """,
+            (now - 60, now - 3600)
+        ).fetchone()
+        oldest_queued = conn.execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status IN ('queued', 'sending')"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "by_status": by_status,
+        "sent_last_minute": last_minute or 0,
+        "sent_last_hour": last_hour or 0,
+        "avg_send_latency_seconds": round(avg_latency, 2) if avg_latency is not None else None,
+        "oldest_pending_age_seconds": round(now - oldest_queued, 1) if oldest_queued else None,
+    }
+
+def dispatch_once(service=None) -> int:
+    """Sends one leased batch; returns how many emails were attempted."""
+    from tools.bulk_email import send_bulk_emails
+
+    items = claim_batch()
+    if not items:
+        return 0
+    results = send_bulk_emails(
+        [{"key": i["dedup_key"], "recipient_email": i["recipient_email"],
+          "subject": i["subject"], "body": i["body"]} for i in items],
+        service=service
+    )
+    for item, result in zip(items, results):
+        if result["status"] == "sent":
+            mark_sent(item["id"], result["message_id"])
+        else:
+            logger.warning(f"Email {item['dedup_key']} failed (attempt {item['attempts'] + 1}): {result['error']}")
+            mark_failed(item["id"], item["attempts"], result["error"])
+    return len(items)
+
+def run_dispatcher(stop: Optional[threading.Event] = None):
+    """Drains the outbox until `stop` is set (forever when run as a process)."""
+    from tools.send_email_tool import get_gmail_service
+
+    stop = stop or threading.Event()
+    service = None
+    logger.info(f"Email dispatcher started on {OUTBOX_DB}")
+    while not stop.is_set():
+        try:
+            # One authenticated client for the life of the dispatcher
+            if service is None:
+                service = get_gmail_service()
+            sent = dispatch_once(service)
+        except Exception as e:
+            logger.error(f"Email dispatch failed: {e}", exc_info=True)
+            service = None
+            sent = 0
+        if not sent:
+            stop.wait(POLL_SECONDS)
+
+if __name__ == "__main__":
+    run_dispatcher()
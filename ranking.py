@@ -0,0 +1,164 @@
+import os
+import re
+import json
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from blob_store import load_resume
+from logging_config import setup_logger
+from screening import estimate_tokens, format_candidate
+
+logger = setup_logger("Ranking")
+
+# Lexical pre-filter ahead of the LLM screener: resumes are scored with BM25
+# against the job's qualifications; only the top K plus a borderline band
+# are sent on.
+RANKING_ENABLED = os.getenv("RANKING_ENABLED", "true").lower() == "true"
+TOP_K = int(os.getenv("RANKING_TOP_K", "50"))
+# Candidates past the top K still go through if they score within this
+# fraction of the K-th score
+BORDERLINE_BAND = float(os.getenv("RANKING_BORDERLINE_BAND", "0.2"))
+# ...up to this many of them, best first
+BORDERLINE_MAX = int(os.getenv("RANKING_BORDERLINE_MAX", "25"))
+# Scores are relative to the best resume (0..1); past the top K, at or below
+# this is dropped (the top K always goes through, even a small zero-overlap pool)
+MIN_SCORE = float(os.getenv("RANKING_MIN_SCORE", "0.0"))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "to", "with", "our", "you", "your", "we",
+    "will", "experience", "years", "year", "strong", "knowledge", "ability",
+    "skills", "required", "preferred", "plus", "including",
+}
+
+def tokenize(text: str) -> List[str]:
+    tokens = (t.rstrip(".") for t in _TOKEN_RE.findall(str(text).lower()))
+    return [t for t in tokens if t and t not in _STOPWORDS]
+
+class BM25Index:
+    """
+    Inverted index over a fixed set of documents. Postings are stored as
+    NumPy arrays grouped by term, so scoring a query is a handful of
+    vectorized operations regardless of how many documents there are.
+    """
+
+    def __init__(self, documents: List[List[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(documents)
+        self.vocabulary: Dict[str, int] = {}
+
+        doc_ids = []
+        term_ids = []
+        for doc_id, tokens in enumerate(documents):
+            for token in tokens:
+                term_ids.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+                doc_ids.append(doc_id)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        n_terms = len(self.vocabulary)
+
+        self.doc_lengths = np.bincount(doc_ids, minlength=self.n_docs).astype(np.float64)
+        self.avg_doc_length = self.doc_lengths.mean() if self.n_docs and self.doc_lengths.mean() > 0 else 1.0
+
+        # One posting per (term, doc) with its term frequency, sorted by term
+        pairs, tf = np.unique(term_ids * max(self.n_docs, 1) + doc_ids, return_counts=True)
+        self.postings_terms = pairs // max(self.n_docs, 1)
+        self.postings_docs = pairs % max(self.n_docs, 1)
+        self.postings_tf = tf.astype(np.float64)
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(self.postings_terms, minlength=n_terms))))
+
+        df = np.diff(self.offsets).astype(np.float64)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+
+    def score(self, query: List[str]) -> np.ndarray:
+        scores = np.zeros(self.n_docs, dtype=np.float64)
+        term_ids = sorted({self.vocabulary[t] for t in query if t in self.vocabulary})
+        if not term_ids:
+            return scores
+
+        slices = [np.arange(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+        idx = np.concatenate(slices)
+        docs = self.postings_docs[idx]
+        tf = self.postings_tf[idx]
+        idf = self.idf[self.postings_terms[idx]]
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_doc_length)
+        contributions = idf * tf * (self.k1 + 1) / (tf + norm)
+        return np.bincount(docs, weights=contributions, minlength=self.n_docs)
+
+def job_query(job_description: str) -> List[str]:
+    """Query terms from the JobDescription JSON's qualifications."""
+    try:
+        jd = json.loads(job_description)
+    except (TypeError, ValueError):
+        return tokenize(job_description or "")
+    qualifications = jd.get("qualifications") or jd.get("responsibilities") or []
+    return tokenize(" ".join(str(q) for q in qualifications))
+
+def prefilter_candidates(job_description: str, candidates: List[Dict],
+                         top_k: int = TOP_K,
+                         band: float = BORDERLINE_BAND,
+                         borderline_max: int = BORDERLINE_MAX,
+                         min_score: float = MIN_SCORE) -> Tuple[List[Dict], Dict]:
+    """
+    Returns the candidates to send to the LLM screener (in their original
+    order) and a report of the scores, cut-offs and estimated tokens saved.
+    """
+    report = {
+        "enabled": RANKING_ENABLED,
+        "total": len(candidates),
+        "top_k": top_k,
+        "borderline_band": band,
+        "borderline_max": borderline_max,
+        "min_score": min_score,
+    }
+    query = job_query(job_description)
+    if not RANKING_ENABLED or not candidates or not query:
+        report.update(selected=len(candidates), filtered_out=0, tokens_saved=0)
+        return candidates, report
+
+    index = BM25Index([tokenize(load_resume(c)) for c in candidates])
+    raw = index.score(query)
+    best = raw.max()
+    if best <= 0:
+        # Nothing matched at all; don't guess, let the LLM see everyone
+        report.update(selected=len(candidates), filtered_out=0, tokens_saved=0)
+        return candidates, report
+    scores = raw / best
+
+    # Stable sort: ties keep application order
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    kth_score = scores[order[min(top_k, len(order)) - 1]] if top_k > 0 else 1.0
+    band_floor = kth_score * (1 - band)
+
+    in_top_k = ranks < top_k
+    in_band = ~in_top_k & (ranks < top_k + borderline_max) & (scores >= band_floor) & (scores > min_score)
+    keep = in_top_k | in_band
+
+    selected = [c for c, k in zip(candidates, keep) if k]
+    dropped = [c for c, k in zip(candidates, keep) if not k]
+    tokens_saved = sum(estimate_tokens(format_candidate(0, c)) for c in dropped)
+
+    report.update(
+        selected=len(selected),
+        top_k_selected=int(in_top_k.sum()),
+        borderline_selected=int(in_band.sum()),
+        filtered_out=len(dropped),
+        kth_score=round(float(kth_score), 4),
+        band_floor=round(float(band_floor), 4),
+        tokens_saved=tokens_saved,
+        scores={c["name"]: round(float(s), 4) for c, s in zip(candidates, scores)},
+    )
+    logger.info(
+        f"Pre-filter: {len(selected)}/{len(candidates)} candidates to the screener "
+        f"(top {report['top_k_selected']} + {report['borderline_selected']} borderline), "
+        f"~{tokens_saved} prompt tokens saved"
+    )
+    return selected, report
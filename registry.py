@@ -0,0 +1,74 @@
+import threading
+from typing import Any, Callable, Dict
+
+from logging_config import setup_logger
+
+logger = setup_logger("Registry")
+
+class ProcessRegistry:
+    """
+    Builds each registered object once per process, on first use, and hands
+    the same instance to every caller afterwards. Used for agent chains and
+    the compiled graph, which are stateless and expensive to rebuild.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        # Re-entrant: a builder may fetch other entries
+        self._lock = threading.RLock()
+
+    def register(self, name: str, builder: Callable[[], Any]):
+        with self._lock:
+            self._builders[name] = builder
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._builders:
+                    raise KeyError(f"Nothing registered under '{name}'")
+                self._instances[name] = self._builders[name]()
+                logger.info(f"Built '{name}'")
+            return self._instances[name]
+
+    def clear(self):
+        """Drops built instances (e.g. after changing the LLM); builders stay."""
+        with self._lock:
+            self._instances.clear()
+
+if __name__ == "__main__":
+    # Microbenchmark: GROQ_API_KEY=x python registry.py
+    # No LLM calls are made; this only measures construction overhead.
+    import time
+    import graph
+    from langgraph.checkpoint.memory import MemorySaver
+
+    def per_call(func, n):
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        return (time.perf_counter() - start) / n * 1000
+
+    factories = {
+        "job_analyst": graph.create_job_analyst_agent,
+        "resume_screener": graph.create_resume_screener_agent,
+        "interviewer": graph.create_interviewer_agent,
+        "decision_maker": graph.create_decision_maker_agent,
+    }
+    print(f"{'component':<18}{'rebuilt (ms)':>14}{'registry (ms)':>15}")
+    for name, factory in factories.items():
+        graph.get_agent(name)
+        rebuilt = per_call(lambda: factory(graph.llm), 200)
+        cached = per_call(lambda: graph.get_agent(name), 200)
+        print(f"{name:<18}{rebuilt:>14.3f}{cached:>15.4f}")
+
+    # In-memory checkpointer so the benchmark leaves no checkpoints.db behind
+    rebuilt = per_call(lambda: graph.build_graph(checkpointer=MemorySaver()), 20)
+    graph.registry.register("graph", lambda: graph.build_graph(checkpointer=MemorySaver()))
+    graph.get_graph()  # first build, paid once per process
+    cached = per_call(graph.get_graph, 20)
+    print(f"{'compiled graph':<18}{rebuilt:>14.3f}{cached:>15.4f}")
@@ -0,0 +1,298 @@
+import os
+import io
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from exceptions import FileProcessingError
+from logging_config import setup_logger
+
+logger = setup_logger("ResumeExtraction")
+
+# PDF/DOCX parsing is CPU-bound and can be slow on large files, so it runs in
+# a separate process pool with a per-document timeout and a page cap.
+EXTRACTION_WORKERS = int(os.getenv("RESUME_EXTRACTION_WORKERS", "2"))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("RESUME_EXTRACTION_TIMEOUT_SECONDS", "20"))
+MAX_PDF_PAGES = int(os.getenv("RESUME_MAX_PDF_PAGES", "20"))
+# A document whose worker was killed because *another* document hung is
+# resubmitted to the fresh pool this many times before giving up
+EXTRACTION_RESUBMITS = 2
+
+# Placeholder texts stored in place of a resume that could not be read
+EXTRACTION_FAILED = "(text extraction failed)"
+UNSUPPORTED_FORMAT = "Resume text extraction not supported for this format"
+
+# Extracted text keyed by the upload's SHA-256: in memory, and on disk so a
+# re-uploaded resume costs nothing across restarts.
+CACHE_DIR = os.getenv(
+    "RESUME_EXTRACTION_CACHE_DIR",
+    os.path.join(os.getenv("BLOB_STORE_DIR", "blobs"), "extracted")
+)
+MEMORY_CACHE_SIZE = 256
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_memory_cache: "OrderedDict[str, str]" = OrderedDict()
+_memory_cache_lock = threading.Lock()
+
+def _extract_pdf(stream, max_pages: int) -> str:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(stream)
+    pages = []
+    for i, page in enumerate(reader.pages):
+        if i >= max_pages:
+            break
+        pages.append(page.extract_text() or "")
+    return "".join(pages)
+
+def _extract_docx(stream) -> str:
+    from docx import Document
+
+    doc = Document(stream)
+    return "\n".join(para.text for para in doc.paragraphs)
+
+def _extract_stream(stream, extension: str, max_pages: int) -> str:
+    if extension == ".pdf":
+        return _extract_pdf(stream, max_pages)
+    return _extract_docx(stream)
+
+def _extract(file_content: bytes, extension: str, max_pages: int) -> str:
+    """Runs in a pool process."""
+    return _extract_stream(io.BytesIO(file_content), extension, max_pages)
+
+def _extract_path(path: str, extension: str, max_pages: int) -> str:
+    """
+    Runs in a pool process. Only the path crosses the process boundary; the
+    parsers read from the open file rather than a bytes copy of it. (Not an
+    mmap: zipfile needs .seekable(), which mmap only has from Python 3.13.)
+    """
+    with open(path, "rb") as f:
+        return _extract_stream(f, extension, max_pages)
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process has threads running
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def _recycle_pool(pool: ProcessPoolExecutor):
+    """
+    Drops a pool whose worker is stuck and kills its processes, so the hung
+    parse stops using CPU and later documents get fresh workers. Other
+    documents in flight on the pool fail with BrokenProcessPool and are
+    resubmitted by their callers.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.kill()
+    pool.shutdown(wait=False)
+
+def _cache_key(digest: str, extension: str) -> str:
+    return f"{digest}-{extension.lstrip('.')}-{MAX_PDF_PAGES}"
+
+def _cache_get(key: str) -> Optional[str]:
+    with _memory_cache_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+    try:
+        with open(os.path.join(CACHE_DIR, key + ".txt"), "r", encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    _cache_put_memory(key, text)
+    return text
+
+def _cache_put_memory(key: str, text: str):
+    with _memory_cache_lock:
+        _memory_cache[key] = text
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+def _cache_put(key: str, text: str):
+    _cache_put_memory(key, text)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, os.path.join(CACHE_DIR, key + ".txt"))
+
+def _run_extraction(func, source, extension: str, filename: str, key: str) -> str:
+    """
+    Extracted text for one document. A document that cannot be parsed, or
+    that times out, gets the fallback text. Losing a worker for any other
+    reason raises FileProcessingError, so the caller can retry instead of
+    storing the fallback.
+    """
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    global _pool
+    for attempt in range(EXTRACTION_RESUBMITS + 1):
+        pool = _get_pool()
+        try:
+            try:
+                future = pool.submit(func, source, extension, MAX_PDF_PAGES)
+            except RuntimeError as e:
+                # Shut down by another caller between _get_pool() and submit
+                raise BrokenProcessPool(str(e))
+            text = future.result(timeout=EXTRACTION_TIMEOUT_SECONDS)
+            break
+        except FutureTimeoutError:
+            logger.warning(f"Resume extraction timed out after {EXTRACTION_TIMEOUT_SECONDS}s: {filename}")
+            _recycle_pool(pool)
+            return f"Resume uploaded: {filename} {EXTRACTION_FAILED}"
+        except (BrokenProcessPool, CancelledError) as e:
+            # The pool was recycled under us (another document hung); this
+            # document was never the problem, so try it on a fresh pool
+            with _pool_lock:
+                if _pool is pool:
+                    _pool = None
+            logger.warning(f"Extraction pool lost while parsing {filename} (attempt {attempt + 1}): {e!r}")
+        except Exception as e:
+            print(f"Error extracting resume text: {e}")
+            return f"Resume uploaded: {filename} {EXTRACTION_FAILED}"
+    else:
+        raise FileProcessingError(f"Resume extraction pool failed repeatedly for {filename}")
+
+    _cache_put(key, text)
+    return text
+
+def is_extraction_fallback(text: str) -> bool:
+    """True for the placeholder text stored when a resume could not be read."""
+    return text.endswith(EXTRACTION_FAILED) or text == UNSUPPORTED_FORMAT
+
+def extract_text_from_resume(file_content: bytes, filename: str) -> str:
+    """
+    Extract text from resume file (PDF, DOC, DOCX).
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in (".pdf", ".docx"):
+        return UNSUPPORTED_FORMAT
+
+    key = _cache_key(hashlib.sha256(file_content).hexdigest(), extension)
+    return _run_extraction(_extract, file_content, extension, filename, key)
+
+def extract_text_from_resume_file(path: str, filename: str, digest: Optional[str] = None) -> str:
+    """
+    Same as extract_text_from_resume, for a file on disk (e.g. a blob store
+    path). Pass the file's SHA-256 as `digest` when it is already known.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in (".pdf", ".docx"):
+        return UNSUPPORTED_FORMAT
+
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+    return _run_extraction(_extract_path, path, extension, filename, _cache_key(digest, extension))
+
+def _synthetic_pdf(pages: int, seed: int) -> bytes:
+    """A text PDF with `pages` pages, for the benchmark below."""
+    from PyPDF2 import PageObject, PdfWriter
+    from PyPDF2.generic import (
+        DecodedStreamObject, DictionaryObject, NameObject
+    )
+
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    font_ref = writer._add_object(font)
+    for p in range(pages):
+        page = PageObject.create_blank_page(None, 612, 792)
+        lines = [f"Candidate {seed} page {p} line {i}: Python, FastAPI, SQL, {i * seed} years" for i in range(40)]
+        ops = ["BT /F1 10 Tf 40 760 Td 12 TL"] + [f"({line}) Tj T*" for line in lines] + ["ET"]
+        stream = DecodedStreamObject()
+        stream.set_data("\n".join(ops).encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font_ref})
+        })
+        writer.add_page(page)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+def _synthetic_docx(paragraphs: int, seed: int) -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Candidate {seed} paragraph {i}: led a team of {i % 9 + 1} engineers on data pipelines.")
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+if __name__ == "__main__":
+    # Benchmark: python resume_extraction.py
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    CACHE_DIR = tempfile.mkdtemp(prefix="resume-extraction-bench-")
+    corpus = [(_synthetic_pdf(pages=8, seed=i), f"resume_{i}.pdf") for i in range(12)]
+    corpus += [(_synthetic_docx(paragraphs=200, seed=i), f"resume_{i}.docx") for i in range(12)]
+    print(f"Corpus: {len(corpus)} documents, {sum(len(c) for c, _ in corpus) / 1024:.0f} KiB")
+
+    start = time.perf_counter()
+    for content, name in corpus:
+        _extract(content, os.path.splitext(name)[1], MAX_PDF_PAGES)
+    print(f"In-process, sequential:      {time.perf_counter() - start:.2f}s")
+
+    # Start the workers and import the parsers outside the timing
+    warmup = [(_synthetic_pdf(pages=1, seed=-i), f"warmup_{i}.pdf") for i in range(EXTRACTION_WORKERS * 2)]
+    with ThreadPoolExecutor(max_workers=len(warmup)) as callers:
+        list(callers.map(lambda doc: extract_text_from_resume(*doc), warmup))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as callers:
+        list(callers.map(lambda doc: extract_text_from_resume(*doc), corpus))
+    print(f"Process pool ({EXTRACTION_WORKERS} workers):    {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    for content, name in corpus:
+        extract_text_from_resume(content, name)
+    print(f"Re-upload (hash cache hit):  {time.perf_counter() - start:.4f}s")
+
+    # The upload path: spooled files on disk, as the ingestion worker sees them
+    _memory_cache.clear()
+    CACHE_DIR = tempfile.mkdtemp(prefix="resume-extraction-bench-")
+    spool = tempfile.mkdtemp(prefix="resume-extraction-files-")
+    paths = []
+    for i, (content, name) in enumerate(corpus):
+        path = os.path.join(spool, f"{i}-{name}")
+        with open(path, "wb") as f:
+            f.write(content)
+        paths.append((path, name))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as callers:
+        texts = list(callers.map(lambda doc: extract_text_from_resume_file(*doc), paths))
+    print(f"From files ({EXTRACTION_WORKERS} workers):      {time.perf_counter() - start:.2f}s")
+    failed = [name for (_, name), text in zip(paths, texts) if is_extraction_fallback(text) or not text]
+    assert not failed, f"Extraction from file failed for {failed}"
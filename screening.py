@@ -0,0 +1,189 @@
+import os
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from agents.screener import ScreenedCandidates
+from blob_store import load_resume
+from resume_extraction import is_extraction_fallback
+from logging_config import setup_logger
+
+logger = setup_logger("Screening")
+
+# Candidates are screened in batches that fit a prompt budget, and the
+# batches go to the LLM concurrently. One batch == the old single prompt.
+BATCH_TOKEN_BUDGET = int(os.getenv("SCREENING_BATCH_TOKENS", "6000"))
+MAX_CONCURRENCY = int(os.getenv("SCREENING_MAX_CONCURRENCY", "4"))
+CHARS_PER_TOKEN = 4
+# Each verdict is stored with a watermark (resume hash + job description
+# version); a later pass only screens candidates whose watermark changed
+SCREENING_INCREMENTAL = os.getenv("SCREENING_INCREMENTAL", "true").lower() == "true"
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count; good enough for sizing prompts."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _name_key(name: str) -> str:
+    return " ".join(str(name).split()).casefold()
+
+def format_candidate(position: int, candidate: Dict) -> str:
+    return f"=== CANDIDATE {position} ===\nName: {candidate['name']}\nResume: {load_resume(candidate)}"
+
+def shard_candidates(candidates: List[Dict], token_budget: int = BATCH_TOKEN_BUDGET) -> List[List[Tuple[int, Dict]]]:
+    """
+    Splits candidates into batches of (index, candidate) whose formatted
+    text fits `token_budget`. A candidate larger than the budget gets a
+    batch of its own. Two candidates with the same name never share a batch,
+    so the names the LLM returns map back to exactly one candidate.
+    """
+    batches: List[List[Tuple[int, Dict]]] = []
+    current: List[Tuple[int, Dict]] = []
+    current_tokens = 0
+    current_names = set()
+
+    for index, candidate in enumerate(candidates):
+        tokens = estimate_tokens(format_candidate(len(current) + 1, candidate))
+        key = _name_key(candidate["name"])
+        if current and (current_tokens + tokens > token_budget or key in current_names):
+            batches.append(current)
+            current, current_tokens, current_names = [], 0, set()
+        current.append((index, candidate))
+        current_tokens += tokens
+        current_names.add(key)
+
+    if current:
+        batches.append(current)
+    return batches
+
+def _batch_input(job_description: str, batch: List[Tuple[int, Dict]]) -> Dict:
+    return {
+        "job_description": job_description,
+        "candidates": "\n\n".join(
+            format_candidate(position, candidate)
+            for position, (_, candidate) in enumerate(batch, start=1)
+        )
+    }
+
+def _resolve(names: List[str], batch: List[Tuple[int, Dict]]) -> List[int]:
+    """Maps names returned for a batch to candidate indexes (exact, then normalized)."""
+    exact = {candidate["name"]: index for index, candidate in batch}
+    normalized = {_name_key(candidate["name"]): index for index, candidate in batch}
+    indexes = []
+    for name in names:
+        index = exact.get(name, normalized.get(_name_key(name)))
+        if index is None:
+            logger.warning(f"Screener returned unknown candidate '{name}' - ignoring")
+        else:
+            indexes.append(index)
+    return indexes
+
+def screen_candidates(agent, job_description: str, candidates: List[Dict],
+                      token_budget: int = BATCH_TOKEN_BUDGET,
+                      max_concurrency: int = MAX_CONCURRENCY) -> Tuple[List[Dict], ScreenedCandidates]:
+    """
+    Screens candidates batch by batch and merges the results.
+
+    Returns the passed candidates (in their original order) and a combined
+    ScreenedCandidates with canonical names. Failed batches are retried once;
+    if any batch still fails the error is raised.
+    """
+    batches = shard_candidates(candidates, token_budget)
+    inputs = [_batch_input(job_description, batch) for batch in batches]
+    logger.info(f"Screening {len(candidates)} candidates in {len(batches)} batch(es), "
+                f"up to {max_concurrency} at a time")
+
+    results = agent.batch(inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+
+    retry = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+    if retry:
+        logger.warning(f"Retrying {len(retry)} failed screening batch(es)")
+        retried = agent.batch([inputs[i] for i in retry],
+                              config={"max_concurrency": max_concurrency},
+                              return_exceptions=True)
+        for i, result in zip(retry, retried):
+            results[i] = result
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise RuntimeError(f"{len(errors)} of {len(batches)} screening batch(es) failed: {errors[0]}")
+
+    passed = set()
+    failed = set()
+    reasoning = []
+    for number, (batch, result) in enumerate(zip(batches, results), start=1):
+        batch_passed = _resolve(result.passed, batch)
+        passed.update(batch_passed)
+        failed.update(i for i in _resolve(result.failed, batch) if i not in batch_passed)
+        reasoning.append(result.reasoning if len(batches) == 1 else f"Batch {number}: {result.reasoning}")
+
+    passed_candidates = [candidates[i] for i in sorted(passed)]
+    merged = ScreenedCandidates(
+        passed=[c["name"] for c in passed_candidates],
+        failed=[candidates[i]["name"] for i in sorted(failed)],
+        reasoning="\n".join(reasoning)
+    )
+    return passed_candidates, merged
+
+def _candidate_key(candidate: Dict) -> str:
+    # Same key as the candidates / screening_results reducers in state.py
+    email = (candidate.get("email") or "").strip().lower()
+    return email or candidate.get("name", "")
+
+def jd_version(job_description: str) -> str:
+    return hashlib.sha256((job_description or "").encode("utf-8")).hexdigest()[:16]
+
+def screening_watermark(candidate: Dict, jd_ver: str) -> str:
+    """Changes when the candidate's resume or the job description changes."""
+    resume_hash = candidate.get("resume_hash") or hashlib.sha256(load_resume(candidate).encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{resume_hash}|{jd_ver}".encode("utf-8")).hexdigest()
+
+def plan_incremental_screening(job_description: str, candidates: List[Dict],
+                               previous: List[Dict]) -> Tuple[List[Dict], List[Dict], Dict[str, str]]:
+    """
+    Splits candidates into (pending, current_results, watermarks): pending
+    are new or changed since their last verdict, current_results are the
+    still-valid verdicts for the rest, and watermarks maps every
+    candidate's key to its current watermark.
+    """
+    jd_ver = jd_version(job_description)
+    by_key = {_candidate_key(r): r for r in previous or []}
+    watermarks = {_candidate_key(c): screening_watermark(c, jd_ver) for c in candidates}
+    pending, current = [], []
+    for candidate in candidates:
+        key = _candidate_key(candidate)
+        result = by_key.get(key)
+        if result is not None and result.get("watermark") == watermarks[key]:
+            current.append(result)
+        else:
+            pending.append(candidate)
+    return pending, current, watermarks
+
+def screening_results(pending: List[Dict], sent_to_llm: List[Dict], passed: List[Dict],
+                      watermarks: Dict[str, str]) -> List[Dict]:
+    """
+    One verdict per pending candidate; stage says whether the LLM or the BM25
+    pre-filter decided. A resume whose text could not be extracted gets no
+    pre-filter verdict (BM25 only saw the placeholder), so it stays pending.
+    """
+    sent = {_candidate_key(c) for c in sent_to_llm}
+    passed_keys = {_candidate_key(c) for c in passed}
+    now = datetime.now().isoformat()
+    results = []
+    for c in pending:
+        key = _candidate_key(c)
+        if key not in sent and is_extraction_fallback(load_resume(c)):
+            logger.info(f"No text extracted from {c['name']}'s resume; left unscreened")
+            continue
+        results.append({
+            "name": c["name"],
+            "email": c.get("email"),
+            "watermark": watermarks[key],
+            "passed": key in passed_keys,
+            "stage": "llm" if key in sent else "prefilter",
+            "screened_at": now,
+        })
+    return results
+
+def passed_from_results(candidates: List[Dict], results: List[Dict]) -> List[Dict]:
+    """Candidates (in their order) whose current verdict is a pass."""
+    passed_keys = {_candidate_key(r) for r in results if r["passed"]}
+    return [c for c in candidates if _candidate_key(c) in passed_keys]
@@ -1,14 +1,48 @@
-from typing import TypedDict, List, Optional, Dict
+from typing import Annotated, Any, Callable, TypedDict, List, Optional, Dict
+
+def merge_by_key(key: Callable[[Dict], str]):
+    """
+    Reducer for list channels: merges an update into the current list,
+    keyed by `key(item)`. New keys are appended in order and an existing key
+    is replaced in place, so writers can push just the new entries and
+    re-sending a full list is harmless.
+    """
+    def reducer(current: Optional[List[Dict]], update: Optional[List[Dict]]) -> List[Dict]:
+        if not update:
+            return current or []
+        merged = {key(item): item for item in current or []}
+        for item in update:
+            merged[key(item)] = item
+        return list(merged.values())
+    return reducer
+
+def _candidate_key(candidate: Dict) -> str:
+    email = (candidate.get("email") or "").strip().lower()
+    return email or candidate.get("name", "")
+
+# The `candidates` reducer, for code that merges outside a graph update
+merge_candidates = merge_by_key(_candidate_key)
+
+def _response_key(entry: Dict) -> str:
+    return entry.get("candidate", "")
+
+def _delivery_key(entry: Dict) -> str:
+    return entry.get("key", "")
 
 class Candidate(TypedDict):
     """Represents a candidate with their information."""
     name: str
     email: str  # ✅ NEW
-    resume: str
+    resume: str  # Legacy inline text; new entries use resume_hash instead
+    resume_hash: Optional[str]  # SHA-256 of the resume text in blob_store
+    resume_preview: Optional[str]  # First few hundred characters, for display
+    resume_file_hash: Optional[str]  # SHA-256 of the original upload
     phone: Optional[str]  # ✅ NEW
     cover_letter: Optional[str]  # ✅ NEW
     linkedin_url: Optional[str]  # ✅ NEW
     applied_at: Optional[str]  # ✅ NEW
+    duplicate_of: Optional[str]  # Email of the applicant whose resume this nearly duplicates
+    duplicate_similarity: Optional[float]  # Estimated Jaccard similarity to that resume
 class InterviewResult(TypedDict):
     """Represents the result of an interview."""
     candidate_name: str
@@ -27,10 +61,12 @@ class GraphState(TypedDict):
     job_id: Optional[str]
     
     # Candidate sourcing stage
-    candidates: Optional[List[Candidate]]
+    candidates: Annotated[Optional[List[Candidate]], merge_candidates]
     
     # Screening stage
     screened_candidates: Optional[List[Candidate]]
+    screening_prefilter: Optional[Dict[str, Any]]  # BM25 pre-filter cut-offs, scores and tokens saved
+    screening_results: Annotated[Optional[List[Dict[str, Any]]], merge_by_key(_candidate_key)]  # Verdict + watermark per candidate
     
     # Interview stage
     confirmed_candidates: Optional[List[Candidate]]
@@ -46,19 +82,22 @@ class GraphState(TypedDict):
     
     # ✅ NEW: Track offers
     offers_sent: Optional[List[str]]  # List of candidate names who received offers
-    offer_responses: Optional[List[Dict[str, str]]]  # List of all responses received
+    offer_responses: Annotated[Optional[List[Dict[str, str]]], merge_by_key(_response_key)]  # List of all responses received
     
     # Onboarding stage
     onboarding_status: Optional[str]
     onboarding_info: Optional[Dict[str, str]]
     joining_date: Optional[str]
     
+    # Per-recipient results of every email the workflow sent
+    email_deliveries: Annotated[Optional[List[Dict[str, Any]]], merge_by_key(_delivery_key)]
+    
     # Error handling
     error: Optional[str]
 
     onboarding_forms_sent: Optional[List[str]]  # Who we sent forms to
     offer_reply: Optional[Dict[str, str]]  # Now includes salary_expectation, comments
-    onboarding_submissions: Optional[List[Dict[str, str]]]  # Completed submissions
+    onboarding_submissions: Annotated[Optional[List[Dict[str, str]]], merge_by_key(_response_key)]  # Completed submissions
     onboarding_submission: Optional[Dict[str, str]]  # Single submission being processed
     hiring_status: Optional[str]  # Final status
     job_description_approved: Optional[bool]
@@ -4,8 +4,9 @@ import uuid
 import json
 import time
 from datetime import datetime
-from graph import build_graph
+from graph import get_graph
 from db import save_state, load_state
+from locks import job_lock
 from config import API_BASE_URL  # ✅ Import API URL
 
 # Page configuration
@@ -33,7 +34,7 @@ if 'job_id' not in st.session_state:
 if 'workflow_stage' not in st.session_state:
     st.session_state.workflow_stage = "Not Started"
 if 'graph_app' not in st.session_state:
-    st.session_state.graph_app = build_graph()
+    st.session_state.graph_app = get_graph()
 if 'workflow_complete' not in st.session_state:
     st.session_state.workflow_complete = False
 
@@ -178,8 +179,8 @@ with tab1:
                         "recursion_limit": 50
                     }
                     
-                    # Save initial state
-                    save_state(job_id, initial_state)
+                    # Save initial state (version 0: the job must not exist yet)
+                    save_state(job_id, initial_state, expected_version=0)
                     
                     try:
                         st.session_state.workflow_stage = "Running..."
@@ -189,45 +190,46 @@ with tab1:
                         logs_placeholder = st.empty()
                         
                         # ✅ Run workflow node by node
-                        for event in st.session_state.graph_app.stream(initial_state, config):
-                            for node_name, node_output in event.items():
-                                st.session_state.workflow_stage = f"Executing: {node_name}"
-                                status_placeholder.info(f"🔄 **Current Node:** {node_name}")
-                                
-                                # Show output
-                                with logs_placeholder.expander(f"📋 {node_name} Output", expanded=False):
-                                    if isinstance(node_output, dict):
-                                        st.json(node_output)
-                                    else:
-                                        st.write(node_output)
-                            
-                            # ✅ Check for interrupts AFTER EACH EVENT
-                            config_check = {"configurable": {"thread_id": job_id}}
-                            graph_state = st.session_state.graph_app.get_state(config_check)
-                            
-                            if graph_state.next:  # Workflow paused
-                                next_node = graph_state.next[0] if isinstance(graph_state.next, list) else graph_state.next
-                                
-                                # Store in session state for Tab 2
-                                st.session_state.workflow_stage = f"⏸️ Paused at: {next_node}"
-                                st.session_state.workflow_started = True
-                                
-                                status_placeholder.empty()  # Clear spinning indicator
-                                logs_placeholder.empty()
-                                
-                                st.success("✅ Workflow started successfully!")
+                        with job_lock(job_id):
+                            for event in st.session_state.graph_app.stream(initial_state, config):
+                                for node_name, node_output in event.items():
+                                    st.session_state.workflow_stage = f"Executing: {node_name}"
+                                    status_placeholder.info(f"🔄 **Current Node:** {node_name}")
+                                    
+                                    # Show output
+                                    with logs_placeholder.expander(f"📋 {node_name} Output", expanded=False):
+                                        if isinstance(node_output, dict):
+                                            st.json(node_output)
+                                        else:
+                                            st.write(node_output)
                                 
-                                # Show specific message based on where it's paused
-                                if next_node == "human_approval":
-                                    st.info("📋 **Action Required:** Please go to the **'✅ Approvals'** tab to review the job description.")
-                                elif next_node == "interviewer":
-                                    st.info("🎤 **Action Required:** Please go to the **'✅ Approvals'** tab to select interview candidates.")
-                                elif next_node == "final_offer_approval":
-                                    st.info("💼 **Action Required:** Please go to the **'✅ Approvals'** tab to approve final offers.")
-                                elif next_node == "wait_for_offer_responses":
-                                    st.info("📨 **Action Required:** Waiting for candidate responses. Go to **'📨 Offer Responses'** tab.")
+                                # ✅ Check for interrupts AFTER EACH EVENT
+                                config_check = {"configurable": {"thread_id": job_id}}
+                                graph_state = st.session_state.graph_app.get_state(config_check)
                                 
-                                break  # Stop processing
+                                if graph_state.next:  # Workflow paused
+                                    next_node = graph_state.next[0] if isinstance(graph_state.next, list) else graph_state.next
+                                    
+                                    # Store in session state for Tab 2
+                                    st.session_state.workflow_stage = f"⏸️ Paused at: {next_node}"
+                                    st.session_state.workflow_started = True
+                                    
+                                    status_placeholder.empty()  # Clear spinning indicator
+                                    logs_placeholder.empty()
+                                    
+                                    st.success("✅ Workflow started successfully!")
+                                    
+                                    # Show specific message based on where it's paused
+                                    if next_node == "human_approval":
+                                        st.info("📋 **Action Required:** Please go to the **'✅ Approvals'** tab to review the job description.")
+                                    elif next_node == "interviewer":
+                                        st.info("🎤 **Action Required:** Please go to the **'✅ Approvals'** tab to select interview candidates.")
+                                    elif next_node == "final_offer_approval":
+                                        st.info("💼 **Action Required:** Please go to the **'✅ Approvals'** tab to approve final offers.")
+                                    elif next_node == "wait_for_offer_responses":
+                                        st.info("📨 **Action Required:** Waiting for candidate responses. Go to **'📨 Offer Responses'** tab.")
+                                    
+                                    break  # Stop processing
                         
                         # If loop completes without interrupt
                         if not graph_state.next:
@@ -359,26 +361,28 @@ with tab2:
                             with col1:
                                 if st.button("✅ Approve", key="approve_job_desc", use_container_width=True):
                                     with st.spinner("Approving and continuing workflow..."):
-                                        st.session_state.graph_app.update_state(
-                                            config,
-                                            {"job_description_approved": True}
-                                        )
-                                        # Resume workflow
-                                        for event in st.session_state.graph_app.stream(None, config):
-                                            pass
+                                        with job_lock(st.session_state.job_id):
+                                            st.session_state.graph_app.update_state(
+                                                config,
+                                                {"job_description_approved": True}
+                                            )
+                                            # Resume workflow
+                                            for event in st.session_state.graph_app.stream(None, config):
+                                                pass
                                         st.success("✅ Job description approved!")
                                         time.sleep(1)
                                         st.rerun()
                             
                             with col2:
                                 if st.button("❌ Reject", key="reject_job_desc", use_container_width=True):
-                                    st.session_state.graph_app.update_state(
-                                        config,
-                                        {"job_description_approved": False}
-                                    )
-                                    # Resume workflow
-                                    for event in st.session_state.graph_app.stream(None, config):
-                                        pass
+                                    with job_lock(st.session_state.job_id):
+                                        st.session_state.graph_app.update_state(
+                                            config,
+                                            {"job_description_approved": False}
+                                        )
+                                        # Resume workflow
+                                        for event in st.session_state.graph_app.stream(None, config):
+                                            pass
                                     st.error("❌ Job description rejected. Workflow ended.")
                                     time.sleep(1)
                                     st.rerun()
@@ -409,7 +413,7 @@ with tab2:
                                 
                                 for candidate in screened_candidates:
                                     st.markdown(f"#### {candidate['name']}")
-                                    st.caption(candidate['resume'][:200] + "...")
+                                    st.caption((candidate.get('resume_preview') or candidate.get('resume', ''))[:200] + "...")
                                     
                                     selections[candidate['name']] = st.radio(
                                         f"Decision for {candidate['name']}:",
@@ -422,10 +426,11 @@ with tab2:
                                 
                                 if st.form_submit_button("📤 Submit Selections", use_container_width=True):
                                     with st.spinner("Processing selections..."):
-                                        st.session_state.graph_app.update_state(
-                                            config,
-                                            {"interview_selections": selections}
-                                        )
+                                        with job_lock(st.session_state.job_id):
+                                            st.session_state.graph_app.update_state(
+                                                config,
+                                                {"interview_selections": selections}
+                                            )
                                         st.success("✅ Selections saved!")
                                         time.sleep(1)
                                         st.rerun()
@@ -441,8 +446,9 @@ with tab2:
                                 
                                 if len(existing_feedback) >= len(to_interview):
                                     st.success("✅ All interviews complete! Continuing workflow...")
-                                    for event in st.session_state.graph_app.stream(None, config):
-                                        pass
+                                    with job_lock(st.session_state.job_id):
+                                        for event in st.session_state.graph_app.stream(None, config):
+                                            pass
                                     time.sleep(1)
                                     st.rerun()
                                 else:
@@ -470,23 +476,28 @@ with tab2:
                                         
                                         if st.form_submit_button("📤 Submit Feedback", use_container_width=True):
                                             with st.spinner("Processing feedback..."):
-                                                all_feedback = {**existing_feedback, **feedback}
-                                                
-                                                st.session_state.graph_app.update_state(
-                                                    config,
-                                                    {"interview_feedback": all_feedback}
-                                                )
-                                                
-                                                for event in st.session_state.graph_app.stream(None, config):
-                                                    pass
+                                                with job_lock(st.session_state.job_id):
+                                                    # Re-read under the lock so feedback saved
+                                                    # meanwhile from elsewhere is kept
+                                                    current_feedback = st.session_state.graph_app.get_state(config).values.get("interview_feedback") or {}
+                                                    all_feedback = {**current_feedback, **feedback}
+                                                    
+                                                    st.session_state.graph_app.update_state(
+                                                        config,
+                                                        {"interview_feedback": all_feedback}
+                                                    )
+                                                    
+                                                    for event in st.session_state.graph_app.stream(None, config):
+                                                        pass
                                                 
                                                 st.success("✅ Feedback submitted!")
                                                 time.sleep(1)
                                                 st.rerun()
                             else:
                                 st.info("No candidates selected for interviews. Continuing workflow...")
-                                for event in st.session_state.graph_app.stream(None, config):
-                                    pass
+                                with job_lock(st.session_state.job_id):
+                                    for event in st.session_state.graph_app.stream(None, config):
+                                        pass
                                 time.sleep(1)
                                 st.rerun()
                 
@@ -510,24 +521,26 @@ with tab2:
                         with col1:
                             if st.button("✅ Approve Offers", key="approve_offers", use_container_width=True):
                                 with st.spinner("Approving and sending offers..."):
-                                    st.session_state.graph_app.update_state(
-                                        config,
-                                        {"final_offer_approved": True}
-                                    )
-                                    for event in st.session_state.graph_app.stream(None, config):
-                                        pass
+                                    with job_lock(st.session_state.job_id):
+                                        st.session_state.graph_app.update_state(
+                                            config,
+                                            {"final_offer_approved": True}
+                                        )
+                                        for event in st.session_state.graph_app.stream(None, config):
+                                            pass
                                     st.success("✅ Offers approved and sent!")
                                     time.sleep(1)
                                     st.rerun()
                         
                         with col2:
                             if st.button("❌ Reject", key="reject_offers", use_container_width=True):
-                                st.session_state.graph_app.update_state(
-                                    config,
-                                    {"final_offer_approved": False}
-                                )
-                                for event in st.session_state.graph_app.stream(None, config):
-                                    pass
+                                with job_lock(st.session_state.job_id):
+                                    st.session_state.graph_app.update_state(
+                                        config,
+                                        {"final_offer_approved": False}
+                                    )
+                                    for event in st.session_state.graph_app.stream(None, config):
+                                        pass
                                 st.error("❌ Offers rejected. Workflow ended.")
                                 time.sleep(1)
                                 st.rerun()
@@ -583,7 +596,7 @@ with tab3:
                     with st.expander(f"👥 Sourced Candidates ({len(state['candidates'])})", expanded=False):
                         for i, candidate in enumerate(state['candidates'], 1):
                             st.markdown(f"**{i}. {candidate['name']}**")
-                            st.caption(candidate['resume'][:200] + "...")
+                            st.caption((candidate.get('resume_preview') or candidate.get('resume', ''))[:200] + "...")
                             st.markdown("---")
                 
                 # Screened Candidates
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+# api builds the graph at import time and every store defaults to a file in
+# the working directory: point them all at a scratch directory, and give the
+# LLM client a key it will never use
+_workdir = tempfile.mkdtemp()
+for var, name in [
+    ("CHECKPOINT_DB_PATH", "checkpoints.db"),
+    ("WORKFLOW_STORE_PATH", "hiring_workflows.db"),
+    ("EMAIL_OUTBOX_PATH", "email_outbox.db"),
+    ("INGESTION_QUEUE_PATH", "ingestion_queue.db"),
+    ("CANDIDATE_INDEX_PATH", "candidate_index.db"),
+    ("NEAR_DUP_INDEX_PATH", "near_duplicates.db"),
+    ("FORM_SYNC_PATH", "form_sync.db"),
+    ("INTERVIEW_KIT_STORE_PATH", "interview_kits.db"),
+    ("LLM_CACHE_PATH", "llm_cache.db"),
+    ("CANDIDATE_DROP_DIR", "candidate_drop"),
+    ("BLOB_STORE_DIR", "blobs"),
+    ("JOB_LOCK_DIR", "locks"),
+]:
+    os.environ.setdefault(var, os.path.join(_workdir, name))
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
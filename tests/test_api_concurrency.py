@@ -0,0 +1,37 @@
+import time
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+import api
+
+DELAY = 0.5
+CONCURRENT_REQUESTS = 8
+
+def _slow_get_state(config):
+    time.sleep(DELAY)
+    return SimpleNamespace(
+        values={"job_id": config["configurable"]["thread_id"]},
+        next=(),
+        metadata={},
+    )
+
+async def _status_burst(n):
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(f"/workflow/status/job-{i}") for i in range(n)))
+        return responses, time.perf_counter() - start
+
+def test_status_requests_do_not_block_the_event_loop(monkeypatch):
+    """A slow blocking read must not serialize concurrent requests."""
+    assert CONCURRENT_REQUESTS <= api.BLOCKING_WORKERS
+    monkeypatch.setattr(api.graph_app, "get_state", _slow_get_state)
+
+    responses, elapsed = asyncio.run(_status_burst(CONCURRENT_REQUESTS))
+
+    assert [r.status_code for r in responses] == [200] * CONCURRENT_REQUESTS
+    assert [r.json()["job_id"] for r in responses] == [f"job-{i}" for i in range(CONCURRENT_REQUESTS)]
+    # Serialized, this would take CONCURRENT_REQUESTS * DELAY
+    assert elapsed < 2 * DELAY
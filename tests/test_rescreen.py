@@ -0,0 +1,59 @@
+import os
+import json
+import asyncio
+
+import httpx
+
+import api
+import graph
+from outbox import get_deliveries
+
+JOB_ID = "rescreen-job"
+CONFIG = {"configurable": {"thread_id": JOB_ID}}
+
+def _pause_at_interviewer():
+    first = {"name": "First Applicant", "email": "first@example.com", "resume": "Python developer"}
+    api.graph_app.update_state(CONFIG, {
+        "job_id": JOB_ID,
+        "job_description": json.dumps({"title": "Engineer", "qualifications": ["Python"]}),
+        "candidates": [first],
+        "screened_candidates": [first],
+    }, as_node="interview_scheduler")
+    # The interviewer interrupts until HR makes selections
+    for _ in api.graph_app.stream(None, CONFIG):
+        pass
+    assert api.graph_app.get_state(CONFIG).next == ("interviewer",)
+
+def _screen_everyone(state):
+    candidates = state["candidates"]
+    return {
+        "screened_candidates": candidates,
+        "screening_results": [
+            {"name": c["name"], "email": c["email"], "watermark": "w", "passed": True,
+             "stage": "llm", "screened_at": "now"}
+            for c in candidates
+        ],
+    }
+
+async def _rescreen():
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(f"/jobs/{JOB_ID}/rescreen")
+
+def test_rescreen_at_interviewer_invites_new_applicants_and_pauses_again(monkeypatch):
+    _pause_at_interviewer()
+    monkeypatch.setattr(graph, "screen_resumes", _screen_everyone)
+    folder = os.path.join(os.environ["CANDIDATE_DROP_DIR"], JOB_ID)
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, "late.csv"), "w") as f:
+        f.write("Name,Email,Resume\nLate Applicant,late@example.com,Python and Go\n")
+
+    response = asyncio.run(_rescreen())
+
+    assert response.status_code == 200, response.text
+    assert response.json()["new_applicants"] == 1
+    state = api.graph_app.get_state(CONFIG)
+    assert state.next == ("interviewer",)
+    assert [c["email"] for c in state.values["screened_candidates"]] == ["first@example.com", "late@example.com"]
+    [invitation] = get_deliveries([f"interview_invitation:{JOB_ID}:late@example.com"])
+    assert invitation["status"] == "queued"
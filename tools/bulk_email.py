@@ -0,0 +1,136 @@
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from logging_config import setup_logger
+from tools.send_email_tool import create_raw_message, get_gmail_service
+
+logger = setup_logger("BulkEmail")
+
+# Gmail per-user sending quota; messages are sent in batch requests of
+# GMAIL_BATCH_SIZE, never faster than GMAIL_SEND_RATE_PER_SECOND.
+GMAIL_SEND_RATE_PER_SECOND = float(os.getenv("GMAIL_SEND_RATE_PER_SECOND", "5"))
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "10"))
+GMAIL_MAX_RETRIES = int(os.getenv("GMAIL_MAX_RETRIES", "2"))
+RETRY_BASE_SECONDS = 2
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, with bursts up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int = 1):
+        for _ in range(n):
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    wait = (1 - self._tokens) / self.rate
+                time.sleep(wait)
+
+# Shared by every sender in the process, since the quota is per Gmail user
+send_limiter = RateLimiter(GMAIL_SEND_RATE_PER_SECOND)
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, HttpError):
+        status = getattr(error.resp, "status", None)
+        if status in (429, 500, 502, 503):
+            return True
+        return status == 403 and b"ateLimitExceeded" in (error.content or b"")
+    # Transport errors (timeouts, connection resets) are worth another try
+    return True
+
+def _result(message: Dict, status: str, message_id: Optional[str] = None, error: Optional[str] = None) -> Dict:
+    return {
+        "key": message.get("key") or message["recipient_email"],
+        "recipient_email": message["recipient_email"],
+        "subject": message["subject"],
+        "status": status,
+        "message_id": message_id,
+        "error": error,
+        "at": datetime.now().isoformat(),
+    }
+
+def send_bulk_emails(messages: List[Dict], service=None) -> List[Dict]:
+    """
+    Sends many emails through one authenticated Gmail client, in rate-limited
+    batch requests, retrying quota and server errors with backoff.
+
+    Each message is a dict with recipient_email, subject, body and an
+    optional key. Returns one result per message, in order, with status
+    "sent" or "failed".
+    """
+    if not messages:
+        return []
+
+    results: List[Optional[Dict]] = [None] * len(messages)
+    try:
+        service = service or get_gmail_service()
+    except Exception as e:
+        logger.error(f"Could not build Gmail client: {e}")
+        return [_result(m, "failed", error=f"Gmail authentication failed: {e}") for m in messages]
+
+    pending = list(range(len(messages)))
+    for attempt in range(GMAIL_MAX_RETRIES + 1):
+        retry: List[int] = []
+
+        for start in range(0, len(pending), GMAIL_BATCH_SIZE):
+            chunk = pending[start:start + GMAIL_BATCH_SIZE]
+            errors: Dict[int, Exception] = {}
+
+            def callback(request_id, response, exception):
+                i = int(request_id)
+                if exception is None:
+                    results[i] = _result(messages[i], "sent", message_id=response.get("id"))
+                else:
+                    errors[i] = exception
+
+            send_limiter.acquire(len(chunk))
+            batch = service.new_batch_http_request()
+            for i in chunk:
+                m = messages[i]
+                batch.add(
+                    service.users().messages().send(
+                        userId="me",
+                        body={"raw": create_raw_message(m["recipient_email"], m["subject"], m["body"])}
+                    ),
+                    callback=callback,
+                    request_id=str(i)
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                # The whole batch request failed; nothing in it was sent
+                for i in chunk:
+                    if results[i] is None:
+                        errors[i] = e
+
+            for i, error in errors.items():
+                if attempt < GMAIL_MAX_RETRIES and _is_retryable(error):
+                    retry.append(i)
+                else:
+                    results[i] = _result(messages[i], "failed", error=str(error))
+
+        if not retry:
+            break
+        delay = RETRY_BASE_SECONDS * (2 ** attempt)
+        logger.warning(f"Retrying {len(retry)} email(s) in {delay}s")
+        time.sleep(delay)
+        pending = sorted(retry)
+
+    sent = sum(1 for r in results if r["status"] == "sent")
+    logger.info(f"Bulk email: {sent}/{len(messages)} sent")
+    return results
@@ -0,0 +1,71 @@
+import re
+from typing import Dict, List
+
+# In-memory stand-in for the gspread client, covering the calls the form
+# tools make, so sourcing can be exercised offline:
+#   FakeSheetsClient({"sheet-id": [header_row, row, ...]})
+
+_RANGE = re.compile(r"^([A-Z]+)(\d+):([A-Z]+)(\d+)$")
+
+def _column_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+class FakeWorksheet:
+    def __init__(self, rows: List[List[str]]):
+        self.rows = rows
+        self.requests: List[str] = []
+
+    def row_values(self, row: int) -> List[str]:
+        self.requests.append(f"row {row}")
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def get(self, range_name: str) -> List[List[str]]:
+        """Like gspread: 1-based inclusive A1 range, trailing empty rows and cells dropped."""
+        self.requests.append(range_name)
+        first_col, first_row, last_col, last_row = _RANGE.match(range_name).groups()
+        first_col, last_col = _column_index(first_col), _column_index(last_col)
+        values = []
+        for row in self.rows[int(first_row) - 1:int(last_row)]:
+            cells = list(row[first_col - 1:last_col])
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get_all_records(self) -> List[Dict]:
+        self.requests.append("all records")
+        headers = self.rows[0] if self.rows else []
+        return [dict(zip(headers, row)) for row in self.rows[1:]]
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet: FakeWorksheet):
+        self.worksheet = worksheet
+
+    def get_worksheet(self, index: int) -> FakeWorksheet:
+        return self.worksheet
+
+class FakeSheetsClient:
+    def __init__(self, sheets: Dict[str, List[List[str]]]):
+        self.sheets = {sheet_id: FakeWorksheet([list(r) for r in rows]) for sheet_id, rows in sheets.items()}
+
+    def open_by_key(self, sheet_id: str) -> FakeSpreadsheet:
+        return FakeSpreadsheet(self.sheets[sheet_id])
+
+    def append_row(self, sheet_id: str, row: List[str]):
+        self.sheets[sheet_id].rows.append(list(row))
+
+    def update_row(self, sheet_id: str, row_number: int, row: List[str]):
+        self.sheets[sheet_id].rows[row_number - 1] = list(row)
+
+    def ranges_requested(self) -> List[str]:
+        """Requests made since the last call, across all sheets."""
+        requests = []
+        for worksheet in self.sheets.values():
+            requests.extend(worksheet.requests)
+            worksheet.requests = []
+        return requests
@@ -0,0 +1,287 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from logging_config import setup_logger
+
+logger = setup_logger("FormSync")
+
+# Incremental Google Form sourcing: for each (sheet, consumer) we keep the
+# last processed row and its form timestamp, plus a hash of every processed
+# row, so a sourcing run only reads rows appended since the previous one.
+SYNC_DB = os.getenv("FORM_SYNC_PATH", "form_sync.db")
+SHEETS_PAGE_ROWS = int(os.getenv("SHEETS_PAGE_ROWS", "200"))
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(SYNC_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 30000")
+    _ensure_schema(conn)
+    return conn
+
+def _ensure_schema(conn: sqlite3.Connection):
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sheet_sync (
+                sheet_id TEXT NOT NULL,
+                consumer TEXT NOT NULL,
+                last_row INTEGER NOT NULL,      -- 1-based sheet row; 1 is the header
+                last_timestamp TEXT,            -- form "Timestamp" of last_row
+                synced_at TEXT NOT NULL,
+                PRIMARY KEY (sheet_id, consumer)
+            );
+            CREATE TABLE IF NOT EXISTS sheet_sync_pending (
+                sheet_id TEXT NOT NULL,
+                consumer TEXT NOT NULL,
+                sync TEXT NOT NULL,             -- read_form_responses() result awaiting confirm_sync()
+                staged_at TEXT NOT NULL,
+                PRIMARY KEY (sheet_id, consumer)
+            );
+            CREATE TABLE IF NOT EXISTS sheet_rows (
+                sheet_id TEXT NOT NULL,
+                consumer TEXT NOT NULL,
+                row_number INTEGER NOT NULL,
+                row_hash TEXT NOT NULL,
+                PRIMARY KEY (sheet_id, consumer, row_number)
+            );
+            """
+        )
+        _schema_ready = True
+
+def _column_letter(n: int) -> str:
+    """1 -> A, 26 -> Z, 27 -> AA."""
+    letters = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def row_hash(headers: List[str], row: List[str]) -> str:
+    return hashlib.sha256(json.dumps([headers, row], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def record_to_candidate(record: Dict) -> Optional[Dict]:
+    """Maps one form response to a candidate, or None if required fields are missing."""
+    candidate = {
+        "name": record.get("Name"),
+        "email": record.get("email id") or record.get("Email"),
+        "phone": record.get("phone Number") or record.get("Phone"),
+        "resume": record.get("Resume/Experience") or record.get("Resume"),
+        "applied_at": record.get("Timestamp") or datetime.now().isoformat()
+    }
+    if candidate["name"] and candidate["email"] and candidate["resume"]:
+        return candidate
+    return None
+
+def get_watermark(sheet_id: str, consumer: str = "default") -> Optional[Dict]:
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT last_row, last_timestamp, synced_at FROM sheet_sync WHERE sheet_id = ? AND consumer = ?",
+            (sheet_id, consumer)
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+def reset_watermark(sheet_id: str, consumer: str = "default"):
+    """Forgets what was synced, so the next run reads the whole sheet again."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM sheet_sync WHERE sheet_id = ? AND consumer = ?", (sheet_id, consumer))
+        conn.execute("DELETE FROM sheet_rows WHERE sheet_id = ? AND consumer = ?", (sheet_id, consumer))
+        conn.execute("DELETE FROM sheet_sync_pending WHERE sheet_id = ? AND consumer = ?", (sheet_id, consumer))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+def _read_pages(worksheet, headers: List[str], start_row: int, page_rows: int):
+    """Yields (row_number, row) from start_row on, one A{n}:{last}{m} range per page."""
+    last_col = _column_letter(len(headers))
+    while True:
+        end_row = start_row + page_rows - 1
+        values = worksheet.get(f"A{start_row}:{last_col}{end_row}")
+        for offset, row in enumerate(values or []):
+            yield start_row + offset, list(row)
+        # The API trims trailing empty rows, so a short page is the last one
+        if not values or len(values) < page_rows:
+            return
+        start_row = end_row + 1
+
+def read_form_responses(client, sheet_id: str, consumer: str = "default",
+                        full_rescan: bool = False,
+                        page_rows: int = SHEETS_PAGE_ROWS) -> Tuple[List[Dict], Dict]:
+    """
+    Reads form responses added since the last committed sync for `consumer`
+    and returns (new_candidates, sync). With full_rescan the whole sheet is
+    read again, but rows whose content hash is unchanged are still skipped,
+    so only new or edited responses come back.
+
+    Nothing is written: pass `sync` to commit_sync() once the candidates are
+    safely stored, or to stage_sync() / confirm_sync() when that happens later.
+    """
+    sync = {"sheet_id": sheet_id, "consumer": consumer, "hashes": {}}
+    worksheet = client.open_by_key(sheet_id).get_worksheet(0)
+    headers = worksheet.row_values(1)
+    watermark = get_watermark(sheet_id, consumer)
+    start_row = 2 if full_rescan or watermark is None else watermark["last_row"] + 1
+    last_row = watermark["last_row"] if watermark else 1
+    last_timestamp = watermark["last_timestamp"] if watermark else None
+    if not headers:
+        sync.update(last_row=last_row, last_timestamp=last_timestamp,
+                    report={"rows_read": 0, "rows_skipped": 0, "new_candidates": 0, "last_row": last_row})
+        return [], sync
+
+    conn = _connect()
+    try:
+        known = {r["row_number"]: r["row_hash"] for r in conn.execute(
+            "SELECT row_number, row_hash FROM sheet_rows WHERE sheet_id = ? AND consumer = ? AND row_number >= ?",
+            (sheet_id, consumer, start_row)
+        )}
+    finally:
+        conn.close()
+
+    candidates: List[Dict] = []
+    hashes: Dict[int, str] = {}
+    rows_read = skipped = 0
+    for row_number, row in _read_pages(worksheet, headers, start_row, page_rows):
+        rows_read += 1
+        if not any(str(cell).strip() for cell in row):
+            continue
+        row = row + [""] * (len(headers) - len(row))
+        digest = row_hash(headers, row)
+        if row_number > last_row:
+            last_row = row_number
+            last_timestamp = row[headers.index("Timestamp")] if "Timestamp" in headers else last_timestamp
+        if known.get(row_number) == digest:
+            skipped += 1
+            continue
+        hashes[row_number] = digest
+        candidate = record_to_candidate(dict(zip(headers, row)))
+        if candidate:
+            candidates.append(candidate)
+        else:
+            logger.warning(f"Skipping incomplete form response in row {row_number}")
+
+    report = {
+        "rows_read": rows_read,
+        "rows_skipped": skipped,
+        "new_candidates": len(candidates),
+        "last_row": last_row,
+        "last_timestamp": last_timestamp,
+    }
+    logger.info(f"Form sync {sheet_id} [{consumer}]: read {rows_read} row(s) from row {start_row}, "
+                f"{skipped} unchanged, {len(candidates)} new candidate(s)")
+    sync.update(last_row=last_row, last_timestamp=last_timestamp, hashes=hashes, report=report)
+    return candidates, sync
+
+def _write_sync(conn: sqlite3.Connection, sync: Dict):
+    conn.executemany(
+        "INSERT OR REPLACE INTO sheet_rows (sheet_id, consumer, row_number, row_hash) VALUES (?, ?, ?, ?)",
+        [(sync["sheet_id"], sync["consumer"], int(n), h) for n, h in sync["hashes"].items()]
+    )
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO sheet_sync (sheet_id, consumer, last_row, last_timestamp, synced_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (sync["sheet_id"], sync["consumer"], sync["last_row"], sync["last_timestamp"], datetime.now().isoformat())
+    )
+
+def commit_sync(sync: Dict):
+    """Advances the watermark and stores the row hashes of a read_form_responses() result."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _write_sync(conn, sync)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+def stage_sync(sync: Dict):
+    """
+    Parks a sync until confirm_sync(): for callers whose candidates are only
+    durable later (a graph node's update is checkpointed after it returns).
+    Until then reads still start from the committed watermark, so the rows
+    are delivered again if the update is lost.
+    """
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO sheet_sync_pending (sheet_id, consumer, sync, staged_at) VALUES (?, ?, ?, ?)",
+            (sync["sheet_id"], sync["consumer"], json.dumps(sync), datetime.now().isoformat())
+        )
+    finally:
+        conn.close()
+
+def confirm_sync(sheet_id: str, consumer: str = "default") -> bool:
+    """Commits the staged sync for (sheet, consumer), if any. Returns whether there was one."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT sync FROM sheet_sync_pending WHERE sheet_id = ? AND consumer = ?", (sheet_id, consumer)
+            ).fetchone()
+            if row is not None:
+                _write_sync(conn, json.loads(row["sync"]))
+                conn.execute("DELETE FROM sheet_sync_pending WHERE sheet_id = ? AND consumer = ?", (sheet_id, consumer))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return row is not None
+
+def sync_form_responses(client, sheet_id: str, consumer: str = "default",
+                        full_rescan: bool = False,
+                        page_rows: int = SHEETS_PAGE_ROWS) -> Tuple[List[Dict], Dict]:
+    """
+    read_form_responses() and commit_sync() in one go, returning
+    (new_candidates, report). For callers that store the candidates
+    themselves before anything else can fail.
+    """
+    candidates, sync = read_form_responses(client, sheet_id, consumer, full_rescan, page_rows)
+    commit_sync(sync)
+    return candidates, sync["report"]
+
+if __name__ == "__main__":
+    import tempfile
+    from tools.fake_sheets import FakeSheetsClient
+
+    SYNC_DB = os.path.join(tempfile.mkdtemp(), "form_sync.db")
+    headers = ["Timestamp", "Name", "email id", "phone Number", "Resume/Experience"]
+    client = FakeSheetsClient({"demo": [headers] + [
+        [f"2025-01-01 10:{i % 60:02d}:00", f"Applicant {i}", f"a{i}@example.com", "", f"Python, {i} years"]
+        for i in range(1, 451)
+    ]})
+
+    for label, kwargs in [("first run", {}), ("no changes", {})]:
+        found, report = sync_form_responses(client, "demo", consumer="job-1", **kwargs)
+        print(f"{label}: {report} ranges={client.ranges_requested()}")
+
+    client.append_row("demo", ["2025-01-02 09:00:00", "Late Applicant", "late@example.com", "", "Go"])
+    client.update_row("demo", 5, ["2025-01-01 10:04:00", "Applicant 4", "a4@example.com", "", "Python, Rust"])
+    found, report = sync_form_responses(client, "demo", consumer="job-1")
+    print(f"one appended: {report} -> {[c['name'] for c in found]}")
+    found, report = sync_form_responses(client, "demo", consumer="job-1", full_rescan=True)
+    print(f"full rescan: {report} -> {[c['name'] for c in found]}")
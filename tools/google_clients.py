@@ -0,0 +1,128 @@
+import os
+import pickle
+import fcntl
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, List, Optional
+
+from google.auth.transport.requests import Request
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+from logging_config import setup_logger
+
+logger = setup_logger("GoogleClients")
+
+# Refresh access tokens this long before they expire, so a call never
+# starts with a token that lapses mid-request
+REFRESH_MARGIN_SECONDS = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+
+class CachedGoogleClient:
+    """
+    One set of OAuth credentials per process, loaded from `token_path` once
+    and refreshed in place shortly before expiry, plus a client built from
+    them once per thread (the Google HTTP transports are not thread-safe).
+    Refreshed tokens are written back in place under a file lock.
+    """
+
+    def __init__(self, token_path: str, credentials_path: str, scopes: List[str],
+                 builder: Callable[[Any], Any]):
+        self.token_path = token_path
+        self.credentials_path = credentials_path
+        self.scopes = scopes
+        self.builder = builder
+        self._creds = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+
+    def _persist(self, creds):
+        # Rewritten in place under an exclusive lock rather than renamed
+        # over: docker-compose bind-mounts the token files one by one, and
+        # os.replace onto a bind-mounted file fails with EBUSY
+        data = pickle.dumps(creds)
+        with open(self.token_path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                f.truncate()
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        with open(self.token_path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                return pickle.load(f)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _expires_soon(self, creds) -> bool:
+        if not creds.valid:
+            return True
+        expiry = getattr(creds, "expiry", None)  # naive UTC, as google-auth stores it
+        return expiry is not None and expiry - datetime.utcnow() < timedelta(seconds=REFRESH_MARGIN_SECONDS)
+
+    def credentials(self):
+        """Valid credentials, loading, refreshing or (first run only) logging in as needed."""
+        with self._lock:
+            creds = self._creds
+            if creds is None and os.path.exists(self.token_path) and os.path.getsize(self.token_path) > 0:
+                creds = self._load()
+
+            if creds is None or self._expires_soon(creds):
+                if creds and creds.refresh_token:
+                    creds.refresh(Request())
+                    logger.info(f"Refreshed token in {self.token_path}")
+                else:
+                    flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, self.scopes)
+                    creds = flow.run_local_server(port=0)
+                    self._generation += 1  # new credential object: rebuild clients
+                # Keep the fresh token in memory even if it cannot be saved,
+                # so a write error does not turn every call into a refresh
+                self._creds = creds
+                try:
+                    self._persist(creds)
+                except OSError as e:
+                    logger.error(f"Could not save refreshed token to {self.token_path}: {e}")
+
+            self._creds = creds
+            return creds
+
+    def get(self):
+        """The calling thread's client, built on first use."""
+        creds = self.credentials()
+        client = getattr(self._local, "client", None)
+        if client is None or self._local.generation != self._generation:
+            client = self._local.client = self.builder(creds)
+            self._local.generation = self._generation
+        return client
+
+    def invalidate(self):
+        """Forget cached credentials and clients (e.g. after the token was revoked)."""
+        with self._lock:
+            self._creds = None
+            self._generation += 1
+
+def _build_gmail(creds):
+    from googleapiclient.discovery import build
+    # Discovery documents ship with the library; no fetch or file cache needed
+    return build('gmail', 'v1', credentials=creds, cache_discovery=False)
+
+def _build_sheets(creds):
+    import gspread
+    return gspread.authorize(creds)
+
+gmail_client = CachedGoogleClient(
+    'token.pickle', 'credentials.json',
+    ['https://www.googleapis.com/auth/gmail.send'],
+    _build_gmail
+)
+
+sheets_client = CachedGoogleClient(
+    'sheets_token.pickle', 'credentials2.json',
+    ['https://www.googleapis.com/auth/spreadsheets.readonly'],
+    _build_sheets
+)
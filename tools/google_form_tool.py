@@ -1,50 +1,27 @@
 from dotenv import load_dotenv
 load_dotenv()
 from langchain_core.tools import tool
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+from tools.google_clients import sheets_client
+from tools.form_sync import commit_sync, read_form_responses, record_to_candidate
 import os
-import pickle
-from typing import List, Dict
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-SCOPES = [
-    'https://www.googleapis.com/auth/spreadsheets.readonly',
-]
+SCOPES = sheets_client.scopes
 
 def get_sheets_service():
-    """Authenticate and return Google Sheets service."""
-    creds = None
-    
-    # Check for existing token
-    if os.path.exists('sheets_token.pickle'):
-        with open('sheets_token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    
-    # If no valid credentials, authenticate
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials2.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Save credentials
-        with open('sheets_token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
+    """
+    Authenticate and return Google Sheets service (a gspread client).
     
-    # Use gspread for easier interface
-    client = gspread.authorize(creds)
-    return client
+    The token is loaded once per process and refreshed before it expires;
+    the client is built once per thread (see tools/google_clients.py).
+    """
+    return sheets_client.get()
 
 @tool
 def fetch_google_form_responses(sheet_id: str) -> List[Dict]:
     """
     Fetches all responses from a Google Form's linked spreadsheet.
+    Sourcing uses fetch_new_form_responses, which reads only new rows.
     
     Args:
         sheet_id: The Google Sheets ID from the form responses
@@ -69,16 +46,10 @@ def fetch_google_form_responses(sheet_id: str) -> List[Dict]:
         # Transform Google Form data to our candidate format
         candidates = []
         for record in all_records:
-            candidate = {
-                "name": record.get("Name") or record.get("Name"),
-                "email": record.get("email id") or record.get("Email"),
-                "phone": record.get("phone Number") or record.get("Phone"),
-                "resume": record.get("Resume/Experience") or record.get("Resume"),
-                "applied_at": record.get("Timestamp", datetime.now().isoformat())
-            }
+            candidate = record_to_candidate(record)
             
             # Only add if we have minimum required fields
-            if candidate["name"] and candidate["email"] and candidate["resume"]:
+            if candidate:
                 candidates.append(candidate)
                 print(f"  ✓ {candidate['name']} ({candidate['email']})")
             else:
@@ -93,6 +64,37 @@ def fetch_google_form_responses(sheet_id: str) -> List[Dict]:
         traceback.print_exc()
         return []
 
+def read_new_form_responses(sheet_id: str, consumer: str = "default",
+                            full_rescan: bool = False, client=None) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Reads the form responses added since `consumer` last synced this sheet
+    (see tools/form_sync.py) without moving its watermark. Returns
+    (candidates, sync); sync is None if the sheet could not be read.
+    Pass a FakeSheetsClient as `client` to run offline.
+    """
+    print(f"--- FETCHING NEW APPLICATIONS FROM GOOGLE FORM ---")
+    try:
+        candidates, sync = read_form_responses(
+            client or get_sheets_service(), sheet_id, consumer=consumer, full_rescan=full_rescan
+        )
+    except Exception as e:
+        print(f"❌ Error fetching form responses: {e}")
+        return [], None
+    print(f"✅ {len(candidates)} new application(s) (sheet read through row {sync['last_row']})\n")
+    return candidates, sync
+
+def fetch_new_form_responses(sheet_id: str, consumer: str = "default",
+                             full_rescan: bool = False, client=None) -> List[Dict]:
+    """
+    read_new_form_responses(), committing the watermark straight away.
+    Sourcing into a job goes through candidate_pipeline.SheetsSource, which
+    commits only once the candidates are in the job's state.
+    """
+    candidates, sync = read_new_form_responses(sheet_id, consumer, full_rescan, client)
+    if sync is not None:
+        commit_sync(sync)
+    return candidates
+
 def get_form_column_mapping(sheet_id: str) -> Dict[str, str]:
     """
     Helper function to see what columns exist in your form.
@@ -110,7 +112,7 @@ def get_form_column_mapping(sheet_id: str) -> Dict[str, str]:
         for i, header in enumerate(headers, 1):
             print(f"{i}. {header}")
         print("="*50)
-        print("\n💡 Update the field mapping in fetch_google_form_responses()")
+        print("\n💡 Update the field mapping in tools/form_sync.py record_to_candidate()")
         print("   to match these column names.\n")
         
         return {h: h for h in headers}
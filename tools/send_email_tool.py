@@ -1,40 +1,27 @@
 from dotenv import load_dotenv
 load_dotenv()
 from langchain_core.tools import tool
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from email.mime.text import MIMEText
 import base64
-import os
-import pickle
+from tools.google_clients import gmail_client
 
-SCOPES = ['https://www.googleapis.com/auth/gmail.send']
+SCOPES = gmail_client.scopes
 
 def get_gmail_service():
-    """Authenticate and return Gmail API service."""
-    creds = None
+    """
+    Authenticate and return Gmail API service.
     
-    # Token file stores the user's access and refresh tokens
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    
-    # If no valid credentials, let user log in
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Save credentials for next run
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    
-    return build('gmail', 'v1', credentials=creds)
+    The token is loaded once per process and refreshed before it expires;
+    the client is built once per thread (see tools/google_clients.py).
+    """
+    return gmail_client.get()
+
+def create_raw_message(recipient_email: str, subject: str, body: str) -> str:
+    """Base64url-encoded MIME message, as the Gmail send API expects."""
+    message = MIMEText(body)
+    message['to'] = recipient_email
+    message['subject'] = subject
+    return base64.urlsafe_b64encode(message.as_bytes()).decode()
 
 @tool
 def send_email_tool(recipient_email: str, subject: str, body: str) -> str:
@@ -42,13 +29,8 @@ def send_email_tool(recipient_email: str, subject: str, body: str) -> str:
     try:
         service = get_gmail_service()
         
-        # Create message
-        message = MIMEText(body)
-        message['to'] = recipient_email
-        message['subject'] = subject
-        
-        # Encode message
-        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+        # Create and encode message
+        raw_message = create_raw_message(recipient_email, subject, body)
         
         # Send message
         send_message = service.users().messages().send(
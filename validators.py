@@ -3,6 +3,15 @@ from exceptions import ValidationException
 
 ALLOWED_EXTENSIONS = {'.pdf', '.doc', '.docx'}
 MAX_FILE_SIZE_MB = 5
+MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+
+# Leading bytes of each allowed format (.docx is a zip, .doc an OLE2 file)
+MAGIC_BYTES = {
+    '.pdf': (b'%PDF-',),
+    '.docx': (b'PK\x03\x04',),
+    '.doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+}
+MAGIC_BYTES_LENGTH = 8
 
 def validate_resume_file(filename: str, file_size: int):
     """
@@ -16,11 +25,22 @@ def validate_resume_file(filename: str, file_size: int):
         )
 
     # Check size (convert MB to bytes)
-    if file_size > (MAX_FILE_SIZE_MB * 1024 * 1024):
+    if file_size > MAX_FILE_SIZE_BYTES:
         raise ValidationException(
             f"File too large. Max size is {MAX_FILE_SIZE_MB}MB."
         )
 
+def validate_resume_header(filename: str, head: bytes):
+    """
+    Checks that the first bytes of the upload match its extension.
+    """
+    _, ext = os.path.splitext(filename)
+    signatures = MAGIC_BYTES.get(ext.lower(), ())
+    if not any(head.startswith(sig) for sig in signatures):
+        raise ValidationException(
+            f"File content does not look like a {ext} document."
+        )
+
 def validate_phone_number(phone: str):
     """
     Basic phone number validation.